@@ -7,6 +7,8 @@ import matplotlib.pyplot as plt
 import seaborn as sns
 from datetime import datetime
 from io import StringIO
+from live_analytics import EVENTS_FILE, EventTail, LiveRollups
+from session_events import SessionEvents
 
 st.set_page_config(page_title="Guardrails Analytics Dashboard", layout="wide")
 plt.style.use('seaborn-v0_8')
@@ -14,6 +16,8 @@ sns.set_palette("husl")
 
 ANALYTICS_FILE = "test_analytics.json"
 CURRENT_TEST_FILE = "charts/current_test_summary.json"
+SWEEP_FILE = "charts/threshold_sweep.json"
+PROFILE_SUMMARY_FILE = "charts/latest_profile_summary.json"
 
 # --- Load Data ---
 def load_analytics():
@@ -21,7 +25,10 @@ def load_analytics():
         st.error(f"Analytics file {ANALYTICS_FILE} not found!")
         return None
     with open(ANALYTICS_FILE, 'r') as f:
-        return json.load(f)
+        data = json.load(f)
+    if 'session_data' in data:
+        data['session_data'] = SessionEvents.from_records(data['session_data'])
+    return data
 
 def load_current_test():
     if not os.path.exists(CURRENT_TEST_FILE):
@@ -29,8 +36,22 @@ def load_current_test():
     with open(CURRENT_TEST_FILE, 'r') as f:
         return json.load(f)
 
+def load_sweep():
+    if not os.path.exists(SWEEP_FILE):
+        return None
+    with open(SWEEP_FILE, 'r') as f:
+        return json.load(f)
+
+def load_profile():
+    if not os.path.exists(PROFILE_SUMMARY_FILE):
+        return None
+    with open(PROFILE_SUMMARY_FILE, 'r') as f:
+        return json.load(f)
+
 data = load_analytics()
 current = load_current_test()
+sweep = load_sweep()
+profile = load_profile()
 
 # --- Helper: Download buttons ---
 def download_button(label, data, file_name, mime):
@@ -76,8 +97,48 @@ with st.container():
 
 st.markdown(f"<div style='text-align:right; color:gray; font-size:0.9em;'>Last updated: {last_updated(ANALYTICS_FILE)}</div>", unsafe_allow_html=True)
 
+# --- Live Mode ---
+# Tails the append-only event log: each refresh reads only the newly appended
+# bytes and folds them into running rollups kept in the session state.
+st.sidebar.header("Live Mode")
+live = st.sidebar.toggle("Auto-refresh metrics", value=False, help=f"Tail {EVENTS_FILE} and refresh only the live panel")
+refresh_seconds = st.sidebar.number_input("Refresh interval (seconds)", min_value=1, max_value=300, value=5, step=1)
+if st.sidebar.button("Reset live counters"):
+    st.session_state.pop("live_tail", None)
+    st.session_state.pop("live_rollups", None)
+
+fragment = getattr(st, "fragment", None) or st.experimental_fragment
+
+@fragment(run_every=refresh_seconds if live else None)
+def live_panel():
+    if "live_tail" not in st.session_state:
+        st.session_state.live_tail = EventTail(EVENTS_FILE)
+        st.session_state.live_rollups = LiveRollups()
+    rollups = st.session_state.live_rollups
+    new_events = rollups.update(st.session_state.live_tail.poll())
+    st.subheader("Live Traffic")
+    c1, c2, c3, c4 = st.columns(4)
+    c1.metric("Live Queries", rollups.total, delta=new_events or None)
+    c2.metric("Blocked", rollups.blocked)
+    c3.metric("Block Rate", f"{rollups.block_rate:.1f}%")
+    c4.metric("Last Event", rollups.last_event[11:19] if rollups.last_event else "-")
+    if not rollups.total:
+        st.info(f"Waiting for events in {EVENTS_FILE}. Run the test system to generate traffic.")
+        return
+    l1, l2 = st.columns(2)
+    with l1:
+        st.markdown(f"**Queries per {rollups.bucket_seconds}s**")
+        series = pd.DataFrame(rollups.series(), columns=["time", "Queries", "Blocked"]).set_index("time")
+        st.line_chart(series)
+    with l2:
+        st.markdown("**Categories**")
+        st.bar_chart(pd.Series(dict(rollups.categories.most_common(10)), name="Queries"))
+
+if live:
+    live_panel()
+
 # --- Tabs ---
-tabs = st.tabs(["Current Test Run", "Overall Analytics", "Tables", "About"])
+tabs = st.tabs(["Current Test Run", "Overall Analytics", "Tables", "Threshold Tuning", "About"])
 
 # --- Tab 1: Current Test Run ---
 with tabs[0]:
@@ -134,6 +195,22 @@ with tabs[0]:
             st.json(current)
         st.markdown("---")
         download_button("Download Current Test Summary (JSON)", json.dumps(current, indent=2), "current_test_summary.json", "application/json")
+    if profile:
+        with st.expander(f"Latest Filter Profile ({profile['samples']} samples over {profile['queries']} queries, {profile['generated'][:19]})"):
+            p1, p2 = st.columns(2)
+            with p1:
+                st.markdown("**Samples by Stage**")
+                st.dataframe(pd.DataFrame(profile['stages']).T)
+            with p2:
+                st.markdown("**Samples by Category**")
+                st.dataframe(pd.DataFrame(profile['categories']).T)
+            st.markdown("**Top Frames (self)**")
+            st.dataframe(pd.DataFrame(profile['top_frames']))
+            if os.path.exists(profile['profile_file']):
+                with open(profile['profile_file'], 'r') as f:
+                    download_button("Download Collapsed Stacks (flame graph input)", f.read(), os.path.basename(profile['profile_file']), "text/plain")
+    else:
+        st.caption("No filter profile yet. Run `python test_safety_system.py --profile` to capture one.")
 
 # --- Tab 2: Overall Analytics ---
 with tabs[1]:
@@ -146,8 +223,7 @@ with tabs[1]:
         with c1:
             st.markdown("**Query Volume Over Time**")
             if 'session_data' in data and data['session_data']:
-                df = pd.DataFrame(data['session_data'])
-                df['timestamp'] = pd.to_datetime(df['timestamp'])
+                df = data['session_data'].to_dataframe(queries=False)
                 df['date'] = df['timestamp'].dt.date
                 daily_counts = df.groupby('date').size()
                 fig, ax = plt.subplots(figsize=(4, 3))
@@ -182,8 +258,7 @@ with tabs[1]:
         with c4:
             st.markdown("**Daily Block Rate (%)**")
             if 'session_data' in data and data['session_data']:
-                df = pd.DataFrame(data['session_data'])
-                df['timestamp'] = pd.to_datetime(df['timestamp'])
+                df = data['session_data'].to_dataframe(queries=False)
                 df['date'] = df['timestamp'].dt.date
                 daily_metrics = df.groupby('date').agg({'blocked': ['sum', 'count']}).reset_index()
                 daily_metrics.columns = ['date', 'blocked_count', 'total_count']
@@ -196,9 +271,9 @@ with tabs[1]:
                 ax.grid(True, alpha=0.3)
                 st.pyplot(fig, use_container_width=True)
         with st.expander("Show raw analytics JSON"):
-            st.json(data)
+            st.json({**data, 'session_data': data['session_data'].to_records()} if 'session_data' in data else data)
         st.markdown("---")
-        download_button("Download Analytics (JSON)", json.dumps(data, indent=2), "test_analytics.json", "application/json")
+        download_button("Download Analytics (JSON)", json.dumps(data, indent=2, default=SessionEvents.to_records), "test_analytics.json", "application/json")
 
 # --- Tab 3: Tables ---
 with tabs[2]:
@@ -216,17 +291,54 @@ with tabs[2]:
             st.dataframe(risk_df)
         st.markdown("**Session Data Table**")
         if 'session_data' in data:
-            df = pd.DataFrame(data['session_data'])
-            st.dataframe(df)
+            st.dataframe(data['session_data'].to_dataframe())
         st.markdown("---")
         # Download as CSV
         if 'session_data' in data:
             csv_buffer = StringIO()
-            pd.DataFrame(data['session_data']).to_csv(csv_buffer, index=False)
+            pd.DataFrame(data['session_data'].to_records()).to_csv(csv_buffer, index=False)
             download_button("Download Session Data (CSV)", csv_buffer.getvalue(), "session_data.csv", "text/csv")
 
-# --- Tab 4: About/Help ---
+# --- Tab 4: Threshold Tuning ---
 with tabs[3]:
+    st.subheader("Threshold Tuning")
+    if not sweep:
+        st.info("No threshold sweep found. Run `python threshold_sweep.py` to generate one.")
+    else:
+        st.caption(f"{sweep['settings']} threshold settings evaluated over {sweep['queries']} labelled queries")
+        c1, c2 = st.columns(2)
+        best = sweep['best']
+        markers = {'max_f1': 'o', 'max_youden_j': 's', 'current_config': 'X'}
+        with c1:
+            st.markdown("**ROC Curve**")
+            fig, ax = plt.subplots(figsize=(4, 3))
+            ax.plot(sweep['roc']['x'], sweep['roc']['y'], linewidth=2, color='#3498db')
+            ax.plot([0, 1], [0, 1], linestyle='--', color='gray', alpha=0.5)
+            for name, marker in markers.items():
+                if name in best:
+                    ax.scatter(best[name]['fpr'], best[name]['tpr'], marker=marker, s=60, label=name, zorder=3)
+            ax.set_xlabel('False Positive Rate')
+            ax.set_ylabel('True Positive Rate')
+            ax.legend(fontsize=7)
+            st.pyplot(fig, use_container_width=True)
+        with c2:
+            st.markdown("**Precision-Recall Curve**")
+            fig, ax = plt.subplots(figsize=(4, 3))
+            ax.plot(sweep['pr']['x'], sweep['pr']['y'], linewidth=2, color='#9b59b6')
+            for name, marker in markers.items():
+                if name in best:
+                    ax.scatter(best[name]['tpr'], best[name]['precision'], marker=marker, s=60, label=name, zorder=3)
+            ax.set_xlabel('Recall')
+            ax.set_ylabel('Precision')
+            ax.set_ylim(0, 1.05)
+            ax.legend(fontsize=7)
+            st.pyplot(fig, use_container_width=True)
+        st.markdown("**Best Operating Points**")
+        st.dataframe(pd.DataFrame(best).T)
+        download_button("Download Threshold Sweep (JSON)", json.dumps(sweep, indent=2), "threshold_sweep.json", "application/json")
+
+# --- Tab 5: About/Help ---
+with tabs[4]:
     st.subheader("About & Help")
     st.markdown("""
     **Guardrails Analytics Dashboard**
@@ -234,6 +346,9 @@ with tabs[3]:
     - **Current Test Run:** Shows metrics and charts for the most recent test run.
     - **Overall Analytics:** Shows all-time analytics, trends, and breakdowns.
     - **Tables:** View and download raw analytics data.
+    - **Threshold Tuning:** ROC and precision-recall curves from `threshold_sweep.py`.
+    - **Latest Filter Profile:** Stage, category and hot-frame breakdown from the last `--profile` test run, with the collapsed stacks for flame-graph tools.
+    - **Live Mode:** Toggle in the sidebar to tail `test_analytics.events.jsonl` and refresh the live panel on an interval.
     - **Download:** Use the download buttons to export analytics for further analysis.
     
     **Legend:**
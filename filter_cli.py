@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Filter CLI
+Lightweight entry point: filter a query or print the analytics summary
+without loading the charting or DataFrame stack.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from rule_set import RULES_FILE
+
+
+def load_safety_filter():
+    """Import the RB_V2 engine only when a query actually has to be filtered"""
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    from RB_V2 import SafetyFilter
+    return SafetyFilter()
+
+
+def filter_text(text, rules_file=RULES_FILE):
+    """Filter one query; inputs longer than a window go through LongInputScanner"""
+    from long_input import LongInputScanner
+    from rule_set import load_rules
+
+    scanner = LongInputScanner(load_safety_filter(), load_rules(rules_file))
+    return scanner.filter_query(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Filter a query with the safety system")
+    parser.add_argument("query", nargs="?", help="Query to filter (use '-' to read stdin)")
+    parser.add_argument("--summary", action="store_true", help="Print the analytics text report instead")
+    parser.add_argument("--json", action="store_true", help="Print the verdict as JSON")
+    parser.add_argument("--rules", default=RULES_FILE, help="Rule configuration")
+    args = parser.parse_args()
+
+    if args.summary:
+        from visualize_analytics import AnalyticsVisualizer
+        AnalyticsVisualizer().generate_text_report()
+        return
+    if not args.query:
+        parser.error("a query (or --summary) is required")
+
+    text = sys.stdin.read() if args.query == "-" else args.query
+    is_safe, message, risk_assessment = filter_text(text, args.rules)
+    if args.json:
+        print(json.dumps({"is_safe": is_safe, "message": message, "risk_assessment": risk_assessment}, default=str))
+    else:
+        print(f"Action: {risk_assessment.get('action', 'unknown')} | Category: {risk_assessment.get('category', 'unknown')} "
+              f"| Risk: {risk_assessment.get('final_risk', 'unknown')}")
+        print(f"Message: {message}")
+    sys.exit(0 if is_safe else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Import-Time Budget Check
+Measures the cold import cost of each entry point with ``python -X importtime``
+and fails when a module exceeds its budget or pulls in a heavy dependency.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+# Cumulative import time budgets in milliseconds for short-lived entry points
+BUDGETS_MS = {
+    "filter_cli": 100,
+    "manage_test_cases": 60,
+    "visualize_analytics": 60,
+    "rule_set": 100,
+    "rule_matcher": 100,
+    "rule_optimizer": 100,
+    "rule_impact": 100,
+    "rule_profiler": 100,
+    "long_input": 100,
+    "shared_rules": 100,
+    "session_events": 100,
+    "sampling_profiler": 100,
+}
+# Dependencies that must only load on first use in the modules above
+HEAVY_MODULES = ("pandas", "numpy", "matplotlib", "seaborn", "streamlit", "RB_V2")
+# Light command paths checked at run time, not just at import: the code must
+# not pull in a heavy dependency (report output goes to a temp dir)
+LIGHT_PATHS = {
+    "visualize_analytics --text-only": (
+        "import tempfile; from visualize_analytics import AnalyticsVisualizer; "
+        "v = AnalyticsVisualizer(); v.output_dir = tempfile.mkdtemp(); v.generate_text_report()"
+    ),
+}
+
+
+def measure_import(module, runs=3, code=None):
+    """
+    Import ``module`` (or run ``code``) in fresh interpreters and return (best
+    cumulative us, heavy modules imported, top (self us, name) entries of the
+    best run).
+    """
+    best = None
+    here = os.path.dirname(os.path.abspath(__file__))
+    for _ in range(runs):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code or f"import {module}"],
+            cwd=here, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise ImportError(result.stderr.strip().splitlines()[-1] if result.stderr else module)
+        entries = []
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "imported package" in line:
+                continue
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            entries.append((int(self_us), int(cumulative_us), name.rstrip()))
+        if code is None:
+            total = next(cumulative for _, cumulative, name in entries if name.strip() == module)
+        else:
+            # Sum of the top-level imports the code triggered
+            total = sum(cumulative for _, cumulative, name in entries if not name.startswith("  "))
+        entries = [(self_us, cumulative, name.strip()) for self_us, cumulative, name in entries]
+        if best is None or total < best[0]:
+            heavy = sorted({name.split(".")[0] for _, _, name in entries} & set(HEAVY_MODULES))
+            top = sorted(((self_us, name) for self_us, _, name in entries), reverse=True)[:5]
+            best = (total, heavy, top)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report and enforce import-time budgets")
+    parser.add_argument("modules", nargs="*", help="Modules to check (default: all budgeted entry points)")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreter runs per module (best is kept)")
+    parser.add_argument("--verbose", action="store_true", help="Show the most expensive imports of each module")
+    args = parser.parse_args()
+
+    modules = args.modules or list(BUDGETS_MS) + list(LIGHT_PATHS)
+    failures = 0
+    print(f"{'Module':<34} {'Import ms':>10} {'Budget ms':>10}  Status")
+    print("-" * 72)
+    for module in modules:
+        try:
+            total_us, heavy, top = measure_import(module, args.runs, LIGHT_PATHS.get(module))
+        except ImportError as e:
+            print(f"{module:<34} {'-':>10} {'-':>10}  ERROR {e}")
+            failures += 1
+            continue
+        budget = BUDGETS_MS.get(module)
+        problems = []
+        if budget is not None and total_us / 1000 > budget:
+            problems.append("over budget")
+        if heavy and (module in BUDGETS_MS or module in LIGHT_PATHS):
+            problems.append(f"imports {', '.join(heavy)}")
+        status = "OK" if not problems else "FAIL " + "; ".join(problems)
+        failures += bool(problems)
+        print(f"{module:<34} {total_us / 1000:>10.1f} {budget if budget is not None else '-':>10}  {status}")
+        if args.verbose:
+            for self_us, name in top:
+                print(f"    {self_us / 1000:>8.1f} ms  {name}")
+    if failures:
+        print(f"\n{failures} module(s) failed the import budget")
+        sys.exit(1)
+    print("\nAll modules within their import budgets")
+
+
+if __name__ == "__main__":
+    main()
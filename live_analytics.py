@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Live Analytics
+Append-only event log for filter decisions, plus an incremental tail reader
+and rollups so the dashboard can refresh at constant cost per poll.
+"""
+
+import json
+import os
+from collections import Counter, OrderedDict
+from datetime import datetime
+
+EVENTS_FILE = "test_analytics.events.jsonl"
+
+
+class EventLog:
+    """Appends session events (same fields as session_data entries) as JSON lines"""
+
+    def __init__(self, path=EVENTS_FILE):
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+
+    def append(self, query, blocked, category, risk_level, response=None, timestamp=None):
+        event = {
+            "timestamp": timestamp or datetime.now().isoformat(),
+            "query": query,
+            "blocked": blocked,
+            "category": category,
+            "risk_level": risk_level,
+            "response": response,
+        }
+        self._file.write(json.dumps(event) + "\n")
+        self._file.flush()
+        return event
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class EventTail:
+    """
+    Reads only the bytes appended to the event log since the previous poll.
+    A partially written last line is kept until its newline arrives; a log
+    that shrank (truncated or rotated) is re-read from the start.
+    """
+
+    def __init__(self, path=EVENTS_FILE, from_start=True):
+        self.path = path
+        self.offset = 0
+        self._partial = b""
+        if not from_start and os.path.exists(path):
+            self.offset = os.path.getsize(path)
+
+    def poll(self, max_bytes=8 * 1024 * 1024):
+        try:
+            size = os.path.getsize(self.path)
+        except FileNotFoundError:
+            return []
+        if size < self.offset:
+            self.offset = 0
+            self._partial = b""
+        if size == self.offset:
+            return []
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            data = f.read(min(size - self.offset, max_bytes))
+        self.offset += len(data)
+        lines = (self._partial + data).split(b"\n")
+        self._partial = lines.pop()
+        events = []
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                events.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+        return events
+
+
+class LiveRollups:
+    """
+    Running totals plus a fixed number of time buckets. Updating costs
+    O(new events) and memory is bounded by max_buckets.
+    """
+
+    def __init__(self, bucket_seconds=60, max_buckets=120):
+        self.bucket_seconds = bucket_seconds
+        self.max_buckets = max_buckets
+        self.total = 0
+        self.blocked = 0
+        self.categories = Counter()
+        self.risk_levels = Counter()
+        self.buckets = OrderedDict()  # bucket start (epoch seconds) -> [queries, blocked]
+        self.last_event = None
+
+    def update(self, events):
+        for event in events:
+            blocked = bool(event.get("blocked"))
+            self.total += 1
+            self.blocked += blocked
+            self.categories[event.get("category", "unknown")] += 1
+            self.risk_levels[event.get("risk_level", "unknown")] += 1
+            try:
+                epoch = datetime.fromisoformat(event["timestamp"]).timestamp()
+            except (KeyError, TypeError, ValueError):
+                continue
+            start = int(epoch // self.bucket_seconds * self.bucket_seconds)
+            bucket = self.buckets.get(start)
+            if bucket is None:
+                newest = next(reversed(self.buckets), None)
+                bucket = self.buckets[start] = [0, 0]
+                if newest is not None and start < newest:
+                    # Out-of-order event: keep buckets sorted by time so the
+                    # oldest bucket is the one evicted
+                    self.buckets = OrderedDict(sorted(self.buckets.items()))
+                while len(self.buckets) > self.max_buckets:
+                    self.buckets.popitem(last=False)
+            bucket[0] += 1
+            bucket[1] += blocked
+            self.last_event = event["timestamp"]
+        return len(events)
+
+    @property
+    def block_rate(self):
+        return self.blocked / self.total * 100 if self.total else 0.0
+
+    def series(self):
+        """[(bucket start datetime, queries, blocked)] oldest first"""
+        return [(datetime.fromtimestamp(start), counts[0], counts[1]) for start, counts in self.buckets.items()]
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+Load Generator
+Replays a recorded query timeline against SafetyFilter in-process with
+open-loop arrivals and reports throughput, latency and queueing delay.
+"""
+
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+
+from live_analytics import EVENTS_FILE
+
+ANALYTICS_FILE = "test_analytics.json"
+REPORT_FILE = "charts/load_test.json"
+DEFAULT_RATES = (1, 2, 4, 8, 16, 32, 64)
+SATURATION_RATIO = 0.9  # achieved / offered QPS below this counts as saturated
+
+
+def load_timeline(source=ANALYTICS_FILE):
+    """
+    Return [(offset seconds, query)] sorted by time from the session_data of an
+    analytics JSON file or from a JSONL capture such as the live event log.
+    """
+    with open(source, 'r', encoding='utf-8') as f:
+        if source.endswith(".jsonl"):
+            events = []
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    events.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # e.g. a partially written last line of a live capture
+                    continue
+        else:
+            events = json.load(f).get("session_data", [])
+    stamped = []
+    for event in events:
+        try:
+            stamped.append((datetime.fromisoformat(event["timestamp"]).timestamp(), event["query"]))
+        except (KeyError, TypeError, ValueError):
+            continue
+    stamped.sort(key=lambda item: item[0])
+    if not stamped:
+        return []
+    start = stamped[0][0]
+    return [(ts - start, query) for ts, query in stamped]
+
+
+def compress_gaps(timeline, max_gap):
+    """Cap idle gaps (e.g. days between test runs) at ``max_gap`` seconds"""
+    if max_gap is None:
+        return timeline
+    compressed = []
+    shift = 0.0
+    previous = 0.0
+    for offset, query in timeline:
+        gap = offset - previous
+        if gap > max_gap:
+            shift += gap - max_gap
+        previous = offset
+        compressed.append((offset - shift, query))
+    return compressed
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def _summarize(values_s):
+    values = sorted(v * 1000 for v in values_s)
+    return {
+        "mean_ms": sum(values) / len(values) if values else 0.0,
+        "p50_ms": percentile(values, 50),
+        "p90_ms": percentile(values, 90),
+        "p99_ms": percentile(values, 99),
+        "max_ms": values[-1] if values else 0.0,
+    }
+
+
+def run_load(filter_factory, timeline, rate=1.0, workers=4):
+    """
+    Replay ``timeline`` at ``rate`` times its original speed with ``workers``
+    threads, each owning its own filter from ``filter_factory``. The filters
+    are built before the clock starts, so construction is not counted as
+    queueing delay.
+
+    Arrivals are open-loop: the dispatcher enqueues every query at its scheduled
+    time whether or not a worker is free, so a slow filter shows up as queueing
+    delay instead of silently lowering the offered load.
+    """
+    jobs = queue.Queue()
+    samples = []  # (scheduled, started, finished)
+    errors = []
+    lock = threading.Lock()
+
+    def worker(safety_filter):
+        while True:
+            job = jobs.get()
+            if job is None:
+                return
+            scheduled, query = job
+            started = time.perf_counter()
+            try:
+                safety_filter.filter_query(query)
+            except Exception as e:
+                with lock:
+                    errors.append(repr(e))
+            finished = time.perf_counter()
+            with lock:
+                samples.append((scheduled, started, finished))
+
+    filters = [filter_factory() for _ in range(workers)]
+    threads = [threading.Thread(target=worker, args=(safety_filter,), daemon=True) for safety_filter in filters]
+    for thread in threads:
+        thread.start()
+
+    t0 = time.perf_counter()
+    for offset, query in timeline:
+        scheduled = t0 + offset / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        jobs.put((scheduled, query))
+    dispatched = time.perf_counter()
+    for _ in threads:
+        jobs.put(None)
+    for thread in threads:
+        thread.join()
+    end = time.perf_counter()
+
+    span = timeline[-1][0] / rate if timeline else 0.0
+    elapsed = end - t0
+    return {
+        "rate": rate,
+        "workers": workers,
+        "requests": len(samples),
+        "errors": len(errors),
+        "offered_qps": len(timeline) / span if span > 0 else None,  # None: everything arrives at once
+        "achieved_qps": len(samples) / elapsed if elapsed > 0 else 0.0,
+        "duration_s": elapsed,
+        "dispatch_lag_ms": max(0.0, dispatched - t0 - span) * 1000,
+        "latency": _summarize([finished - scheduled for scheduled, _, finished in samples]),
+        "service": _summarize([finished - started for _, started, finished in samples]),
+        "queueing": _summarize([started - scheduled for scheduled, started, _ in samples]),
+    }
+
+
+def find_saturation(results):
+    """
+    The highest-rate run that still kept up with its offered load, and the
+    first one that did not (None when the sweep never saturated).
+    """
+    sustained = None
+    for result in sorted(results, key=lambda r: r["rate"]):
+        offered = result["offered_qps"]
+        if offered is not None and result["achieved_qps"] >= SATURATION_RATIO * offered:
+            sustained = result
+        else:
+            return sustained, result
+    return sustained, None
+
+
+def print_results(results):
+    print(f"{'Rate':>6} {'Offered':>9} {'Achieved':>9} {'p50 ms':>8} {'p99 ms':>8} {'Queue p99':>10} {'Service p50':>12} {'Errors':>7}")
+    print("-" * 78)
+    for r in results:
+        offered = "burst" if r["offered_qps"] is None else f"{r['offered_qps']:.1f}"
+        print(f"{r['rate']:>6g} {offered:>9} {r['achieved_qps']:>9.1f} {r['latency']['p50_ms']:>8.2f} "
+              f"{r['latency']['p99_ms']:>8.2f} {r['queueing']['p99_ms']:>10.2f} {r['service']['p50_ms']:>12.3f} {r['errors']:>7}")
+    sustained, saturated = find_saturation(results)
+    if saturated is None:
+        print("\nNo saturation within the tested rates")
+    else:
+        print(f"\nThroughput saturates at ~{saturated['achieved_qps']:.1f} QPS (rate x{saturated['rate']:g}); "
+              f"last sustained rate: {'none' if sustained is None else 'x%g (%.1f QPS)' % (sustained['rate'], sustained['achieved_qps'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded traffic against SafetyFilter with open-loop arrivals")
+    parser.add_argument("--source", default=ANALYTICS_FILE,
+                        help=f"Analytics JSON (session_data) or JSONL capture such as {EVENTS_FILE}")
+    parser.add_argument("--rates", default=",".join(str(r) for r in DEFAULT_RATES),
+                        help="Comma-separated rate factors to step through (1 = original inter-arrival times)")
+    parser.add_argument("--workers", type=int, default=4, help="Concurrent worker threads")
+    parser.add_argument("--max-gap", type=float, default=1.0,
+                        help="Cap idle gaps in the recording at this many seconds (use -1 to keep them)")
+    parser.add_argument("--repeat", type=int, default=1, help="Play the timeline back-to-back this many times")
+    parser.add_argument("--output", default=REPORT_FILE, help="Where to write the JSON report")
+    args = parser.parse_args()
+
+    timeline = compress_gaps(load_timeline(args.source), None if args.max_gap < 0 else args.max_gap)
+    if not timeline:
+        print(f"No timestamped queries found in {args.source}")
+        return
+    span = timeline[-1][0] + (timeline[-1][0] / max(len(timeline) - 1, 1))
+    timeline = [(offset + span * i, query) for i in range(args.repeat) for offset, query in timeline]
+    print(f"Replaying {len(timeline)} queries spanning {timeline[-1][0]:.2f}s with {args.workers} workers")
+
+    from filter_cli import load_safety_filter
+    results = []
+    for rate in (float(r) for r in args.rates.split(",")):
+        results.append(run_load(load_safety_filter, timeline, rate=rate, workers=args.workers))
+    print_results(results)
+
+    sustained, saturated = find_saturation(results)
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump({
+            "source": args.source,
+            "queries": len(timeline),
+            "results": results,
+            "sustained_rate": sustained and sustained["rate"],
+            "saturation_rate": saturated and saturated["rate"],
+            "saturation_qps": saturated and saturated["achieved_qps"],
+        }, f, indent=2)
+    print(f"Report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
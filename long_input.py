@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Long Input Scanning
+Filters pasted documents and transcripts in fixed-size overlapping windows,
+so memory stays bounded and the result points at the offending span.
+"""
+
+from rule_set import iter_rule_entries, normalize_text
+
+ACTION_ORDER = {"allow": 0, "flag": 1, "block": 2}
+RISK_ORDER = {"low": 0, "medium": 1, "high": 2}
+OVER_LIMIT_POLICIES = ("scan", "truncate", "block")
+DEFAULT_SETTINGS = {
+    "max_text_length": 10000,
+    "window_size": 1000,
+    "window_overlap": 100,
+    "over_limit_policy": "scan",
+    "max_reported_spans": 20,
+}
+
+
+def long_input_settings(rules):
+    """Merge performance.max_text_length and performance.long_input over the defaults"""
+    performance = rules.get("performance") or {}
+    settings = dict(DEFAULT_SETTINGS)
+    if performance.get("max_text_length"):
+        settings["max_text_length"] = performance["max_text_length"]
+    settings.update(performance.get("long_input") or {})
+    if settings["over_limit_policy"] not in OVER_LIMIT_POLICIES:
+        raise ValueError(f"over_limit_policy must be one of {', '.join(OVER_LIMIT_POLICIES)}")
+    # A pattern can only be missed at a window boundary if it is longer than the overlap
+    longest = max((len(normalize_text(phrase)) for _, _, _, phrase in iter_rule_entries(rules)), default=0)
+    settings["window_overlap"] = max(settings["window_overlap"], longest)
+    if settings["window_overlap"] >= settings["window_size"]:
+        raise ValueError("window_size must be larger than window_overlap and the longest rule phrase")
+    return settings
+
+
+def _iter_chunks(source, size):
+    if isinstance(source, str):
+        for start in range(0, len(source), size):
+            yield source[start:start + size]
+    elif hasattr(source, "read"):
+        yield from iter(lambda: source.read(size), "")
+    else:
+        yield from source
+
+
+def iter_windows(source, window_size, overlap):
+    """
+    Yield (start_offset, window_text) over a string, a text file object or an
+    iterable of string chunks, holding at most one window plus one chunk.
+    """
+    step = window_size - overlap
+    buffer = ""
+    start = 0
+    for chunk in _iter_chunks(source, window_size):
+        buffer += chunk
+        while len(buffer) >= window_size:
+            yield start, buffer[:window_size]
+            buffer = buffer[step:]
+            start += step
+    # The tail is already covered when it fits in the previous window's overlap
+    if buffer and (start == 0 or len(buffer) > overlap):
+        yield start, buffer
+
+
+class LongInputScanner:
+    """
+    Windowed front end for SafetyFilter.filter_query.
+
+    Each window goes through the full filter (pattern matching and semantic
+    scoring). Window verdicts are combined by taking the most severe action
+    and risk, and the returned risk_assessment carries the offending span.
+    Inputs longer than max_text_length follow over_limit_policy:
+
+    - "scan": scan the whole input in windows
+    - "truncate": scan only the first max_text_length characters
+    - "block": block without scanning
+    """
+
+    def __init__(self, safety_filter, rules, matcher=None, stop_on_block=True):
+        self.safety_filter = safety_filter
+        self.settings = long_input_settings(rules)
+        self.matcher = matcher  # optional CompiledRuleSet/SharedRuleSet for rule attribution
+        self.stop_on_block = stop_on_block
+
+    def filter_query(self, source):
+        """Same contract as SafetyFilter.filter_query: (is_safe, message, risk_assessment)"""
+        settings = self.settings
+        limit = settings["max_text_length"]
+        policy = settings["over_limit_policy"]
+        if isinstance(source, str):
+            # The limit may be below the window size, so check it first
+            over_limit = len(source) > limit and policy != "scan"
+            if over_limit and policy == "block":
+                return self._over_limit(len(source))
+            if not over_limit and len(source) <= settings["window_size"]:
+                return self.safety_filter.filter_query(source)
+
+        worst = None
+        offending = []
+        windows = 0
+        scanned = 0
+        truncated = False
+        for start, window in iter_windows(source, settings["window_size"], settings["window_overlap"]):
+            if start + len(window) > limit and policy != "scan":
+                if policy == "block":
+                    return self._over_limit(start + len(window))
+                window = window[:max(limit - start, 0)]
+                truncated = True
+                if not window:
+                    break
+            windows += 1
+            scanned = start + len(window)
+            is_safe, message, risk_assessment = self.safety_filter.filter_query(window)
+            action = risk_assessment.get("action", "allow")
+            span = (start, start + len(window))
+            if action != "allow" and len(offending) < settings["max_reported_spans"]:
+                offending.append(span)
+            if worst is None or self._severity(risk_assessment) > self._severity(worst[2]):
+                worst = (is_safe, message, risk_assessment, span, window)
+            if truncated or (self.stop_on_block and action == "block"):
+                break
+
+        if worst is None:
+            return self.safety_filter.filter_query("")
+        is_safe, message, risk_assessment, span, window = worst
+        combined = dict(risk_assessment)
+        combined.update({
+            "text_length": len(source) if isinstance(source, str) else scanned,
+            "scanned_length": scanned,
+            "windows": windows,
+            "offending_span": span if combined.get("action", "allow") != "allow" else None,
+            "offending_spans": offending,
+            "over_limit_policy": policy,
+            "truncated": truncated,
+        })
+        if self.matcher is not None and combined["offending_span"]:
+            combined["matched_rules"] = sorted(
+                f"{category}/{kind}" if category else kind
+                for category, kind in self.matcher.match(window)
+            )
+        return is_safe, message, combined
+
+    @staticmethod
+    def _severity(risk_assessment):
+        return (
+            ACTION_ORDER.get(risk_assessment.get("action"), 0),
+            RISK_ORDER.get(risk_assessment.get("final_risk"), 0),
+        )
+
+    def _over_limit(self, length):
+        message = f"Input of at least {length} characters exceeds the {self.settings['max_text_length']} character limit"
+        return False, message, {
+            "action": "block",
+            "category": "input_too_long",
+            "final_risk": "high",
+            "text_length": length,
+            "offending_span": None,
+            "over_limit_policy": "block",
+        }
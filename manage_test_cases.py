@@ -4,108 +4,389 @@ Test Case Management Utility
 Helps manage test cases in the CSV file
 """
 
+import argparse
 import csv
-import sys
+import hashlib
+import json
 import os
 
-def view_test_cases():
-    """Display all test cases"""
-    try:
-        with open("test_cases.csv", "r", encoding='utf-8') as file:
+DEFAULT_TEST_CASES_FILE = "test_cases_bulk.csv"
+FIELDNAMES = ['id', 'query', 'expected_action', 'expected_category', 'description', 'tags']
+VALID_ACTIONS = ('allow', 'block', 'flag')
+TAG_SEPARATOR = ';'
+# Tombstone log line recording the id high-water mark across compactions
+NEXT_ID_MARKER = '#next_id '
+
+
+def normalize_query(query):
+    """Normalize query text for duplicate detection (case and whitespace insensitive)"""
+    return " ".join(query.lower().split())
+
+
+def query_key(query):
+    """Compact hash of the normalized query, used as the deduplication index key"""
+    return hashlib.blake2b(normalize_query(query).encode('utf-8'), digest_size=8).digest()
+
+
+class TestCaseStore:
+    """
+    Append-only CSV test case store.
+
+    Every case gets a stable integer ``id``. Adds are appended to the end of the
+    CSV, deletes are appended to a ``<file>.deleted`` tombstone log, and the
+    in-memory hash index on normalized query text keeps both operations O(1).
+    ``compact()`` rewrites the CSV once to drop tombstoned rows. Ids are never
+    reused: the id high-water mark is kept in the tombstone log across
+    compactions.
+    """
+
+    __test__ = False  # not a pytest test class
+
+    def __init__(self, path=DEFAULT_TEST_CASES_FILE):
+        self.path = path
+        self.tombstone_path = path + ".deleted"
+        self.index = {}        # query hash -> id
+        self.keys_by_id = {}   # id -> query hash
+        self.deleted = set()
+        self.next_id = 1
+        self._persisted_next_id = 1
+        self._legacy_schema = False
+        self._load_index()
+
+    # --- Loading ---
+    def _load_tombstones(self):
+        self.deleted = set()
+        self._persisted_next_id = 1
+        if not os.path.exists(self.tombstone_path):
+            return
+        with open(self.tombstone_path, "r", encoding='utf-8') as file:
+            for line in file:
+                if line.startswith(NEXT_ID_MARKER):
+                    self._persisted_next_id = max(self._persisted_next_id, int(line[len(NEXT_ID_MARKER):]))
+                    continue
+                line = line.strip()
+                if line:
+                    self.deleted.add(int(line))
+
+    def _iter_raw_rows(self):
+        """Stream rows with ids assigned (row position for legacy files without an id column)"""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", newline='', encoding='utf-8') as file:
             reader = csv.DictReader(file)
-            print(f"{'#':<3} {'Query':<40} {'Expected':<8} {'Category':<15} {'Description'}")
-            print("-" * 90)
-            for i, row in enumerate(reader, 1):
-                query = row['query'][:37] + "..." if len(row['query']) > 40 else row['query']
-                print(f"{i:<3} {query:<40} {row['expected_action']:<8} {row['expected_category']:<15} {row['description']}")
-    except FileNotFoundError:
-        print("test_cases.csv not found!")
-
-def add_test_case():
+            self._legacy_schema = reader.fieldnames != FIELDNAMES
+            for position, row in enumerate(reader, 1):
+                row_id = row.get('id')
+                row['id'] = int(row_id) if row_id else position
+                row['tags'] = row.get('tags') or ''
+                row['description'] = row.get('description') or ''
+                yield row
+
+    def _load_index(self):
+        self._load_tombstones()
+        max_id = 0
+        for row in self._iter_raw_rows():
+            max_id = max(max_id, row['id'])
+            if row['id'] in self.deleted:
+                continue
+            key = query_key(row['query'])
+            if key not in self.index:
+                self.index[key] = row['id']
+                self.keys_by_id[row['id']] = key
+        self.next_id = max(max_id + 1, self._persisted_next_id)
+
+    # --- Writing ---
+    def _ensure_schema(self):
+        """Rewrite legacy files once so every row carries a stable id and tags column"""
+        if not os.path.exists(self.path) or not self._legacy_schema:
+            return
+        self._rewrite(include_deleted=True)
+
+    def _rewrite(self, include_deleted=False):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", newline='', encoding='utf-8') as out:
+            writer = csv.DictWriter(out, fieldnames=FIELDNAMES, extrasaction='ignore', quoting=csv.QUOTE_ALL)
+            writer.writeheader()
+            for row in self._iter_raw_rows():
+                if include_deleted or row['id'] not in self.deleted:
+                    writer.writerow(row)
+        os.replace(tmp_path, self.path)
+        self._legacy_schema = False
+
+    def _open_for_append(self):
+        self._ensure_schema()
+        needs_header = not os.path.exists(self.path) or os.path.getsize(self.path) == 0
+        if not needs_header:
+            # Guard against a missing trailing newline corrupting the appended row
+            with open(self.path, "rb") as file:
+                file.seek(-1, os.SEEK_END)
+                missing_newline = file.read(1) != b"\n"
+            if missing_newline:
+                with open(self.path, "a", encoding='utf-8') as file:
+                    file.write("\n")
+        file = open(self.path, "a", newline='', encoding='utf-8')
+        writer = csv.DictWriter(file, fieldnames=FIELDNAMES, extrasaction='ignore', quoting=csv.QUOTE_ALL)
+        if needs_header:
+            writer.writeheader()
+        return file, writer
+
+    def _append(self, writer, query, expected_action, expected_category, description="", tags=()):
+        query = (query or "").strip()
+        expected_action = (expected_action or "").strip().lower()
+        expected_category = (expected_category or "").strip()
+        if not query or not expected_category:
+            raise ValueError("query and expected_category are required")
+        if expected_action not in VALID_ACTIONS:
+            raise ValueError(f"expected_action must be one of {', '.join(VALID_ACTIONS)}")
+        key = query_key(query)
+        if key in self.index:
+            return None
+        case_id = self.next_id
+        self.next_id += 1
+        writer.writerow({
+            'id': case_id,
+            'query': query,
+            'expected_action': expected_action,
+            'expected_category': expected_category,
+            'description': (description or "").strip(),
+            'tags': TAG_SEPARATOR.join(t.strip() for t in tags if t.strip()),
+        })
+        self.index[key] = case_id
+        self.keys_by_id[case_id] = key
+        return case_id
+
+    # --- Public API ---
+    def __len__(self):
+        return len(self.keys_by_id)
+
+    def __contains__(self, query):
+        return query_key(query) in self.index
+
+    def add(self, query, expected_action, expected_category, description="", tags=()):
+        """Append a test case. Returns its new id, or None if the query is a duplicate."""
+        file, writer = self._open_for_append()
+        try:
+            return self._append(writer, query, expected_action, expected_category, description, tags)
+        finally:
+            file.close()
+
+    def delete(self, case_id):
+        """Tombstone a test case by id. Returns False if the id is unknown."""
+        key = self.keys_by_id.pop(case_id, None)
+        if key is None:
+            return False
+        del self.index[key]
+        self.deleted.add(case_id)
+        with open(self.tombstone_path, "a", encoding='utf-8') as file:
+            file.write(f"{case_id}\n")
+        return True
+
+    def compact(self):
+        """
+        Rewrite the CSV without tombstoned rows and reset the tombstone log to
+        just the id high-water mark, so ids of removed rows are not reused
+        """
+        removed = len(self.deleted)
+        if os.path.exists(self.path):
+            self._rewrite()
+        tmp_path = self.tombstone_path + ".tmp"
+        with open(tmp_path, "w", encoding='utf-8') as file:
+            file.write(f"{NEXT_ID_MARKER}{self.next_id}\n")
+        os.replace(tmp_path, self.tombstone_path)
+        self.deleted = set()
+        self._persisted_next_id = self.next_id
+        return removed
+
+    def iter_cases(self):
+        """Stream live test cases as dicts (tags split into a list)"""
+        seen = set(self.keys_by_id)
+        for row in self._iter_raw_rows():
+            # Only the first occurrence of a duplicated query is live
+            if row['id'] in seen:
+                seen.discard(row['id'])
+                row['tags'] = [t for t in row['tags'].split(TAG_SEPARATOR) if t]
+                yield row
+
+    def select(self, tag=None, category=None):
+        """Stream test cases carrying ``tag`` and/or with ``expected_category == category``"""
+        for row in self.iter_cases():
+            if tag and tag not in row['tags']:
+                continue
+            if category and row['expected_category'] != category:
+                continue
+            yield row
+
+    def import_file(self, path, tags=()):
+        """
+        Stream-import test cases from a CSV or JSONL file.
+        Returns (added, duplicates, invalid) counts.
+        """
+        added = duplicates = invalid = 0
+        file, writer = self._open_for_append()
+        try:
+            for record in _iter_import_records(path):
+                record_tags = list(tags)
+                extra = record.get('tags') or []
+                if isinstance(extra, str):
+                    extra = extra.split(TAG_SEPARATOR)
+                record_tags.extend(t for t in extra if t not in record_tags)
+                try:
+                    case_id = self._append(
+                        writer,
+                        record.get('query'),
+                        record.get('expected_action'),
+                        record.get('expected_category'),
+                        record.get('description', ""),
+                        record_tags,
+                    )
+                except (ValueError, AttributeError):
+                    invalid += 1
+                    continue
+                if case_id is None:
+                    duplicates += 1
+                else:
+                    added += 1
+        finally:
+            file.close()
+        return added, duplicates, invalid
+
+
+def _iter_import_records(path):
+    """Yield one dict per record from a .jsonl/.ndjson or CSV file without loading it whole"""
+    if path.endswith((".jsonl", ".ndjson")):
+        with open(path, "r", encoding='utf-8') as file:
+            for line in file:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    record = {}
+                yield record if isinstance(record, dict) else {}
+    else:
+        with open(path, "r", newline='', encoding='utf-8') as file:
+            yield from csv.DictReader(file)
+
+
+def print_test_cases(rows):
+    """Display test cases in a table"""
+    print(f"{'ID':<6} {'Query':<40} {'Expected':<8} {'Category':<18} {'Description'}")
+    print("-" * 96)
+    count = 0
+    for row in rows:
+        query = row['query'][:37] + "..." if len(row['query']) > 40 else row['query']
+        print(f"{row['id']:<6} {query:<40} {row['expected_action']:<8} {row['expected_category']:<18} {row['description']}")
+        count += 1
+    print(f"\n{count} test case(s)")
+
+
+def view_test_cases(store, tag=None, category=None):
+    """Display all test cases, optionally filtered by tag or category"""
+    if not os.path.exists(store.path):
+        print(f"{store.path} not found!")
+        return
+    print_test_cases(store.select(tag=tag, category=category))
+
+
+def add_test_case(store):
     """Add a new test case"""
     print("Enter test case details:")
     query = input("Query: ").strip()
     expected_action = input("Expected action (allow/block/flag): ").strip()
     expected_category = input("Expected category: ").strip()
     description = input("Description: ").strip()
-    
+    tags = input("Tags (optional, ';' separated): ").strip()
+
     if not all([query, expected_action, expected_category, description]):
         print("All fields are required!")
         return
-    
-    # Read existing test cases
-    test_cases = []
-    try:
-        with open("test_cases.csv", "r", encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            test_cases = list(reader)
-    except FileNotFoundError:
-        pass
-    
-    # Add new test case
-    new_case = {
-        'query': query,
-        'expected_action': expected_action,
-        'expected_category': expected_category,
-        'description': description
-    }
-    test_cases.append(new_case)
-    
-    # Write back to CSV
-    with open("test_cases.csv", "w", newline='', encoding='utf-8') as file:
-        writer = csv.DictWriter(file, fieldnames=['query', 'expected_action', 'expected_category', 'description'])
-        writer.writeheader()
-        writer.writerows(test_cases)
-    
-    print(f"Added test case: {query}")
-
-def delete_test_case():
-    """Delete a test case by number"""
-    view_test_cases()
-    try:
-        num = int(input("\nEnter test case number to delete: ")) - 1
-    except ValueError:
-        print("Invalid number!")
-        return
-    
-    # Read existing test cases
+
     try:
-        with open("test_cases.csv", "r", encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            test_cases = list(reader)
-    except FileNotFoundError:
-        print("test_cases.csv not found!")
+        case_id = store.add(query, expected_action, expected_category, description, tags.split(TAG_SEPARATOR))
+    except ValueError as e:
+        print(f"Invalid test case: {e}")
         return
-    
-    if 0 <= num < len(test_cases):
-        deleted = test_cases.pop(num)
-        print(f"Deleted: {deleted['query']}")
-        
-        # Write back to CSV
-        with open("test_cases.csv", "w", newline='', encoding='utf-8') as file:
-            writer = csv.DictWriter(file, fieldnames=['query', 'expected_action', 'expected_category', 'description'])
-            writer.writeheader()
-            writer.writerows(test_cases)
+    if case_id is None:
+        print(f"Duplicate query, not added: {query}")
     else:
-        print("Invalid test case number!")
+        print(f"Added test case #{case_id}: {query}")
 
-def main():
-    if len(sys.argv) > 1:
-        command = sys.argv[1]
-        if command == "view":
-            view_test_cases()
-        elif command == "add":
-            add_test_case()
-        elif command == "delete":
-            delete_test_case()
-        else:
-            print("Unknown command. Use: view, add, or delete")
+
+def delete_test_case(store, case_id=None):
+    """Delete a test case by its stable id"""
+    if case_id is None:
+        view_test_cases(store)
+        try:
+            case_id = int(input("\nEnter test case ID to delete: "))
+        except ValueError:
+            print("Invalid ID!")
+            return
+    if store.delete(case_id):
+        print(f"Deleted test case #{case_id}")
     else:
+        print("Invalid test case ID!")
+
+
+def import_test_cases(store, path, tags=()):
+    """Bulk import test cases from a CSV or JSONL file"""
+    if not os.path.exists(path):
+        print(f"{path} not found!")
+        return
+    added, duplicates, invalid = store.import_file(path, tags)
+    print(f"Imported {added} test case(s) from {path} ({duplicates} duplicate(s), {invalid} invalid row(s) skipped)")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Test Case Management Utility")
+    parser.add_argument("--file", default=DEFAULT_TEST_CASES_FILE,
+                        help=f"Test case CSV to operate on (default: {DEFAULT_TEST_CASES_FILE})")
+    subparsers = parser.add_subparsers(dest="command")
+
+    view = subparsers.add_parser("view", help="View test cases")
+    view.add_argument("--tag", help="Only show cases with this tag")
+    view.add_argument("--category", help="Only show cases with this expected category")
+
+    subparsers.add_parser("add", help="Add a new test case interactively")
+
+    delete = subparsers.add_parser("delete", help="Delete a test case by ID")
+    delete.add_argument("id", nargs="?", type=int, help="Test case ID (prompted if omitted)")
+
+    import_ = subparsers.add_parser("import", help="Bulk import test cases from CSV or JSONL")
+    import_.add_argument("path", help="CSV or .jsonl file to import")
+    import_.add_argument("--tag", action="append", default=[], help="Tag to attach to every imported case (repeatable)")
+
+    subparsers.add_parser("compact", help="Rewrite the CSV without deleted cases")
+    return parser
+
+
+def main():
+    parser = build_parser()
+    args = parser.parse_args()
+    if not args.command:
         print("Test Case Management Utility")
         print("Usage:")
-        print("  python manage_test_cases.py view    - View all test cases")
-        print("  python manage_test_cases.py add     - Add a new test case")
-        print("  python manage_test_cases.py delete  - Delete a test case")
+        print("  python manage_test_cases.py view [--tag T] [--category C]  - View test cases")
+        print("  python manage_test_cases.py add                             - Add a new test case")
+        print("  python manage_test_cases.py delete [ID]                     - Delete a test case")
+        print("  python manage_test_cases.py import FILE [--tag T]           - Bulk import CSV/JSONL")
+        print("  python manage_test_cases.py compact                         - Drop deleted cases from the CSV")
+        print(f"Use --file to choose the CSV (default: {DEFAULT_TEST_CASES_FILE})")
+        return
+
+    store = TestCaseStore(args.file)
+    if args.command == "view":
+        view_test_cases(store, tag=args.tag, category=args.category)
+    elif args.command == "add":
+        add_test_case(store)
+    elif args.command == "delete":
+        delete_test_case(store, args.id)
+    elif args.command == "import":
+        import_test_cases(store, args.path, args.tag)
+    elif args.command == "compact":
+        removed = store.compact()
+        print(f"Compacted {store.path}: removed {removed} deleted case(s)")
+
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    main()
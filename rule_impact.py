@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Rule Impact Cache
+Records which rules each test case depends on so that a test run after a rule
+edit only re-evaluates the cases whose verdict could change.
+"""
+
+import glob
+import hashlib
+import json
+import os
+
+from rule_set import (
+    NON_VERDICT_SECTIONS,
+    PHRASE_SECTIONS,
+    THRESHOLD_KEYS,
+    digest,
+    iter_rule_entries,
+    normalize_text,
+    threshold_values,
+)
+
+CACHE_FILE = "test_run_cache.json"
+CACHE_VERSION = 1
+
+
+def engine_fingerprint(module):
+    """Hash the filter engine's source so code changes invalidate cached verdicts"""
+    path = getattr(module, "__file__", None)
+    if not path or not os.path.exists(path):
+        return None
+    if os.path.basename(path) == "__init__.py":
+        files = sorted(glob.glob(os.path.join(os.path.dirname(path), "**", "*.py"), recursive=True))
+    else:
+        files = [path]
+    h = hashlib.sha256()
+    for name in files:
+        with open(name, "rb") as file:
+            h.update(file.read())
+    return h.hexdigest()
+
+
+def numeric_scores(risk_assessment):
+    """Numeric values in a risk assessment that thresholds may be compared against"""
+    return sorted(
+        float(value) for value in (risk_assessment or {}).values()
+        if isinstance(value, (int, float)) and not isinstance(value, bool)
+    )
+
+
+class RuleImpactCache:
+    """
+    Cached verdicts plus per-case rule dependencies.
+
+    A case depends on every blocked/discussion pattern and phrase whose
+    normalized text occurs in the normalized query, and on the thresholds
+    through the numeric scores in its risk assessment. The semantic phrase
+    sets (harmful_intents, legitimate_topics) feed the similarity score of
+    every query, so changing them, the engine source or any other verdict
+    setting invalidates the whole cache.
+    """
+
+    def __init__(self, rules, cache_file=CACHE_FILE, engine=None):
+        self.cache_file = cache_file
+        self.entries = {
+            key: normalize_text(phrase)
+            for key, category, kind, phrase in iter_rule_entries(rules)
+        }
+        self.thresholds = threshold_values(rules)
+        other = {
+            key: value for key, value in rules.items()
+            if key not in ("safety_categories",) + PHRASE_SECTIONS + THRESHOLD_KEYS + NON_VERDICT_SECTIONS
+        }
+        self.global_digest = digest({
+            "semantic": {section: rules.get(section) for section in PHRASE_SECTIONS},
+            "other": other,
+            "engine": engine,
+        })
+        self.previous = self._load()
+        self.cases = dict(self.previous.get("cases", {})) if self.previous else {}
+
+    def _load(self):
+        try:
+            with open(self.cache_file, "r", encoding="utf-8") as file:
+                cache = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if cache.get("version") != CACHE_VERSION:
+            return None
+        return cache
+
+    def dependencies(self, query):
+        """Keys of all rule entries that match the query"""
+        text = normalize_text(query)
+        return sorted(key for key, phrase in self.entries.items() if phrase and phrase in text)
+
+    def plan(self, queries, full=False):
+        """
+        Diff the rule set against the cached run.
+        Returns (queries to re-evaluate, human readable reason).
+        """
+        queries = list(dict.fromkeys(queries))
+        if full:
+            reason = "--full requested"
+        elif not self.previous:
+            reason = "no previous run cached"
+        elif self.previous.get("global") != self.global_digest:
+            reason = "semantic phrases, engine or other settings changed"
+        else:
+            reason = None
+        if reason:
+            self.cases = {}
+            return set(queries), reason
+
+        old_entries = set(self.previous.get("entries", []))
+        removed = old_entries - set(self.entries)
+        added_phrases = [self.entries[key] for key in set(self.entries) - old_entries if self.entries[key]]
+        old_thresholds = self.previous.get("thresholds", {})
+        changed_thresholds = [
+            (old_thresholds.get(name), self.thresholds.get(name))
+            for name in set(old_thresholds) | set(self.thresholds)
+            if old_thresholds.get(name) != self.thresholds.get(name)
+        ]
+
+        stale = set()
+        for query in queries:
+            case = self.cases.get(query)
+            if case is None or removed.intersection(case["deps"]):
+                stale.add(query)
+                continue
+            text = normalize_text(query)
+            if any(phrase in text for phrase in added_phrases):
+                stale.add(query)
+            elif changed_thresholds and self._may_flip(case, changed_thresholds):
+                stale.add(query)
+
+        # Forget cases that are no longer part of the corpus, and stale ones so
+        # that a run interrupted before re-evaluating them cannot save them
+        # under the new rule set
+        self.cases = {
+            query: self.cases[query] for query in queries
+            if query in self.cases and query not in stale
+        }
+        reason = (f"{len(removed)} rule(s) removed, {len(added_phrases)} added, "
+                  f"{len(changed_thresholds)} threshold(s) changed")
+        return stale, reason
+
+    @staticmethod
+    def _may_flip(case, changed_thresholds):
+        scores = case.get("scores") or []
+        if not scores:
+            return True
+        for old, new in changed_thresholds:
+            if not isinstance(old, (int, float)) or not isinstance(new, (int, float)):
+                return True
+            low, high = sorted((old, new))
+            if any(low <= score <= high for score in scores):
+                return True
+        return False
+
+    def record(self, query, is_safe, message, risk_assessment):
+        """Store a fresh verdict together with its dependencies"""
+        self.cases[query] = {
+            "verdict": [is_safe, message, risk_assessment],
+            "deps": self.dependencies(query),
+            "scores": numeric_scores(risk_assessment),
+        }
+
+    def verdict(self, query):
+        """Cached (is_safe, message, risk_assessment) for a query"""
+        is_safe, message, risk_assessment = self.cases[query]["verdict"]
+        return is_safe, message, risk_assessment
+
+    def save(self):
+        cache = {
+            "version": CACHE_VERSION,
+            "global": self.global_digest,
+            "entries": sorted(self.entries),
+            "thresholds": self.thresholds,
+            "cases": self.cases,
+        }
+        with open(self.cache_file, "w", encoding="utf-8") as file:
+            json.dump(cache, file, default=str)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Compiled Rule Matcher
+Builds one prefix-merged regular expression over all rule phrases so a query
+is scanned once instead of once per pattern.
+"""
+
+import re
+
+from rule_optimizer import optimize_rules
+from rule_set import iter_rule_entries, normalize_text
+
+_END = ""  # trie marker for the end of a phrase
+
+
+def trie_regex(phrases):
+    """
+    Regex matching any of ``phrases`` with shared prefixes merged, e.g.
+    ["how to kill", "how to hurt"] -> "how\\ to\\ (?:hurt|kill)".
+    Phrases extending a shorter phrase are dropped: for "does any phrase
+    occur" the shorter one already decides.
+    """
+    trie = {}
+    for phrase in phrases:
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node[_END] = True
+    if not trie:
+        return None
+
+    def build(node):
+        if _END in node:
+            return ""
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items())]
+        if len(branches) == 1:
+            return branches[0]
+        return "(?:" + "|".join(branches) + ")"
+
+    return build(trie)
+
+
+class CompiledRuleSet:
+    """
+    Match-ready form of a rule set. ``match(text)`` returns the same
+    (category, kind) groups as rule_set.match_groups, with the optimizer
+    applied first unless ``optimize=False``.
+
+    A single prefix-merged regex finds the positions where some phrase
+    starts; a character trie walked from each of those positions then
+    collects the groups of every phrase starting there.
+    """
+
+    def __init__(self, rules, optimize=True):
+        self.optimization = None
+        if optimize:
+            rules, self.optimization = optimize_rules(rules)
+        self.trie = {}
+        phrases = set()
+        for key, category, kind, phrase in iter_rule_entries(rules):
+            phrase = normalize_text(phrase)
+            if not phrase:
+                continue
+            phrases.add(phrase)
+            node = self.trie
+            for char in phrase:
+                node = node.setdefault(char, {})
+            node.setdefault(_END, set()).add((category, kind))
+        self.pattern = trie_regex(sorted(phrases))
+        self.scanner = re.compile(f"(?={self.pattern})") if self.pattern is not None else None
+
+    def match(self, text):
+        if self.scanner is None:
+            return set()
+        text = normalize_text(text)
+        groups = set()
+        for found in self.scanner.finditer(text):
+            node = self.trie
+            for index in range(found.start(), len(text)):
+                node = node.get(text[index])
+                if node is None:
+                    break
+                if _END in node:
+                    groups |= node[_END]
+        return groups
+
+    def size(self):
+        """Length of the compiled scanner pattern"""
+        return len(self.pattern or "")
@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Rule Set Optimizer
+Compile-time pass that removes duplicate and subsumed patterns from the rule
+set before matchers are built, and reports everything it removed.
+"""
+
+import argparse
+import copy
+import os
+import sys
+import time
+
+import yaml
+
+from rule_set import (
+    PATTERN_KINDS,
+    PHRASE_SECTIONS,
+    RULES_FILE,
+    iter_rule_entries,
+    load_rules,
+    match_groups,
+    normalize_text,
+    rule_key,
+)
+
+
+def _subsumes(short, long):
+    """True if every text containing ``long`` also contains ``short`` as whole words"""
+    return short != long and f" {short} " in f" {long} "
+
+
+def _optimize_patterns(phrases, category, kind, report):
+    """Dedupe (normalized) and drop phrases subsumed by a shorter phrase of the same group"""
+    unique = {}
+    for phrase in phrases:
+        normalized = normalize_text(phrase)
+        if not normalized:
+            continue
+        if normalized in unique:
+            report["exact_duplicates"].append(rule_key(kind, phrase, category))
+        else:
+            unique[normalized] = phrase
+
+    kept = []
+    for normalized, phrase in unique.items():
+        shorter = next((other for other in unique if _subsumes(other, normalized)), None)
+        if shorter is None:
+            kept.append(phrase)
+        else:
+            report["subsumed"].append({
+                "removed": rule_key(kind, phrase, category),
+                "by": rule_key(kind, unique[shorter], category),
+            })
+    return kept
+
+
+def _optimize_phrases(phrases, section, report):
+    """
+    Only exact duplicates are removed from the phrase sections: they also feed
+    semantic similarity, where a case or wording variant is not redundant.
+    """
+    seen = set()
+    kept = []
+    for phrase in phrases:
+        if phrase in seen:
+            report["exact_duplicates"].append(rule_key(section, phrase))
+            continue
+        seen.add(phrase)
+        kept.append(phrase)
+    return kept
+
+
+def optimize_rules(rules):
+    """
+    Return (optimized_rules, report). Removals are limited to those that keep
+    every verdict identical under case-insensitive phrase containment:
+
+    - exact (normalized) duplicates within a pattern list
+    - patterns containing a shorter pattern of the same category and kind as
+      whole words (the shorter one fires whenever the longer one would)
+    - exact duplicates within harmful_intents and legitimate_topics
+
+    Phrases shared between legitimate_topics and a discussion_patterns list are
+    only reported, since the two sections are applied differently.
+    """
+    optimized = copy.deepcopy(rules)
+    report = {"exact_duplicates": [], "subsumed": [], "cross_section": []}
+
+    for category, patterns in (optimized.get("safety_categories") or {}).items():
+        for kind in PATTERN_KINDS:
+            if patterns and patterns.get(kind):
+                patterns[kind] = _optimize_patterns(patterns[kind], category, kind, report)
+    for section in PHRASE_SECTIONS:
+        if optimized.get(section):
+            optimized[section] = _optimize_phrases(optimized[section], section, report)
+
+    legitimate = {normalize_text(phrase) for phrase in optimized.get("legitimate_topics") or []}
+    for category, patterns in (optimized.get("safety_categories") or {}).items():
+        for phrase in (patterns or {}).get("discussion_patterns") or []:
+            if normalize_text(phrase) in legitimate:
+                report["cross_section"].append(rule_key("discussion_patterns", phrase, category))
+
+    report["before"] = count_phrases(rules)
+    report["after"] = count_phrases(optimized)
+    return optimized, report
+
+
+def count_phrases(rules):
+    total = sum(
+        len((patterns or {}).get(kind) or [])
+        for patterns in (rules.get("safety_categories") or {}).values()
+        for kind in PATTERN_KINDS
+    )
+    return total + sum(len(rules.get(section) or []) for section in PHRASE_SECTIONS)
+
+
+def print_optimization_report(report):
+    print("=" * 60)
+    print("RULE SET OPTIMIZATION")
+    print("=" * 60)
+    print(f"Phrases: {report['before']} -> {report['after']}")
+    print(f"\nExact duplicates removed: {len(report['exact_duplicates'])}")
+    for key in report["exact_duplicates"]:
+        print(f"  {key}")
+    print(f"\nSubsumed patterns removed: {len(report['subsumed'])}")
+    for item in report["subsumed"]:
+        print(f"  {item['removed']}  (covered by {item['by']})")
+    print(f"\nAlso listed in legitimate_topics (kept): {len(report['cross_section'])}")
+    for key in report["cross_section"]:
+        print(f"  {key}")
+
+
+def _engine_verdict(context_filter, query):
+    # The reason text may name a different pattern; only the verdict has to match
+    blocked, _reason, category = context_filter.check_patterns(query)
+    return (blocked, category) + tuple(context_filter.analyze_context(query))
+
+
+def verify_equivalence(original, optimized, queries):
+    """
+    Check the optimized rules against the original on every query.
+    Returns a list of (query, original, optimized) mismatches.
+    """
+    from rule_matcher import CompiledRuleSet
+
+    compiled = CompiledRuleSet(optimized, optimize=False)
+    context_filters = None
+    try:
+        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from RB_V2 import ContextAwareFilter
+        context_filters = (ContextAwareFilter(original), ContextAwareFilter(optimized))
+    except ImportError:
+        print("RB_V2 not importable, verifying with the reference matcher only")
+
+    mismatches = []
+    for query in queries:
+        expected, actual = match_groups(original, query), compiled.match(query)
+        if context_filters:
+            expected = (expected,) + _engine_verdict(context_filters[0], query)
+            actual = (actual,) + _engine_verdict(context_filters[1], query)
+        if expected != actual:
+            mismatches.append((query, expected, actual))
+    return mismatches
+
+
+def main():
+    from manage_test_cases import DEFAULT_TEST_CASES_FILE, TestCaseStore
+    from rule_matcher import CompiledRuleSet
+
+    parser = argparse.ArgumentParser(description="Remove duplicate and subsumed rules and verify the result")
+    parser.add_argument("--rules", default=RULES_FILE, help="Rule configuration to optimize")
+    parser.add_argument("--corpus", default=DEFAULT_TEST_CASES_FILE, help="Test case CSV used for verification")
+    parser.add_argument("--output", help="Write the optimized rule set to this YAML file")
+    args = parser.parse_args()
+
+    rules = load_rules(args.rules)
+    optimized, report = optimize_rules(rules)
+    print_optimization_report(report)
+
+    queries = [row["query"] for row in TestCaseStore(args.corpus).iter_cases()]
+    mismatches = verify_equivalence(rules, optimized, queries)
+    print(f"\nVerification on {len(queries)} test cases: {'OK' if not mismatches else f'{len(mismatches)} MISMATCHES'}")
+    for query, expected, actual in mismatches:
+        print(f"  '{query}': {expected} != {actual}")
+
+    # Baseline: one containment test per (pre-normalized) phrase
+    entries = [(category, kind, normalize_text(phrase)) for _, category, kind, phrase in iter_rule_entries(rules)]
+    naive_start = time.perf_counter()
+    for query in queries:
+        text = normalize_text(query)
+        {(category, kind) for category, kind, phrase in entries if phrase in text}
+    naive = time.perf_counter() - naive_start
+    compiled = CompiledRuleSet(optimized, optimize=False)
+    compiled_start = time.perf_counter()
+    for query in queries:
+        compiled.match(query)
+    fast = time.perf_counter() - compiled_start
+    print(f"Matching: {naive * 1000:.2f} ms per-phrase, {fast * 1000:.2f} ms compiled ({compiled.size()} regex chars)")
+
+    if mismatches:
+        sys.exit(1)
+    if args.output:
+        with open(args.output, "w") as f:
+            yaml.safe_dump(optimized, f, sort_keys=False, allow_unicode=True)
+        print(f"Optimized rules written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
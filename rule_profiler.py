@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Rule Hit Profiler
+Counts how often each rule fires, how long each filter stage takes, and
+which rules never matter, over a test corpus or live traffic through a SafetyFilter.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+
+from manage_test_cases import DEFAULT_TEST_CASES_FILE, TestCaseStore
+from rule_set import RULES_FILE, iter_rule_entries, load_rules, normalize_text
+
+# Filter methods timed as pipeline stages when present
+STAGE_METHODS = ("filter_query", "check_patterns", "analyze_context", "filter_response")
+REPORT_FILE = "charts/rule_profile.json"
+
+
+def stage_targets(safety_filter):
+    """(name prefix, object) for the filter and each sub-filter exposing a stage method"""
+    targets = [("", safety_filter)]
+    for name, value in vars(safety_filter).items():
+        if any(callable(getattr(value, method, None)) for method in STAGE_METHODS[1:]):
+            targets.append((f"{name}.", value))
+    return targets
+
+
+def set_method(target, method_name, replacement, patched):
+    """Shadow ``target.method_name`` on the instance, recording how to undo it in ``patched``"""
+    patched.append((target, method_name, target.__dict__.get(method_name)))
+    setattr(target, method_name, replacement)
+
+
+def wrap_stage_methods(safety_filter, wrap, patched):
+    """Replace every stage method of the filter and its sub-filters with ``wrap(stage, method)``"""
+    for prefix, target in stage_targets(safety_filter):
+        for method_name in STAGE_METHODS:
+            method = getattr(target, method_name, None)
+            if callable(method):
+                set_method(target, method_name, wrap(prefix + method_name, method), patched)
+
+
+def restore_methods(patched):
+    """Undo set_method() calls, newest first"""
+    for target, method_name, original in reversed(patched):
+        if original is None:
+            target.__dict__.pop(method_name, None)
+        else:
+            setattr(target, method_name, original)
+    patched.clear()
+
+
+class RuleProfiler:
+    """
+    Per-rule hit counts plus per-stage timings of the real filter.
+
+    Rule hits are measured by matching every normalized rule phrase against the
+    normalized query, the same containment test the differential runner uses.
+    A blocked pattern counts as overridden when a discussion pattern of the
+    same category or a legitimate topic also matched and the final action was
+    not "block".
+    """
+
+    def __init__(self, rules):
+        # Duplicate entries share a key and are profiled once
+        self.entries = list({
+            key: (key, category, kind, normalize_text(phrase))
+            for key, category, kind, phrase in iter_rule_entries(rules)
+        }.values())
+        self.hits = defaultdict(int)
+        self.overridden = defaultdict(int)
+        self.stages = defaultdict(lambda: [0, 0])  # stage -> [calls, total ns]
+        self.queries = 0
+        self._patched = []
+
+    # --- Rule matching ---
+    def observe(self, query, risk_assessment=None):
+        """Record rule hits for one query; ``risk_assessment`` is the filter's verdict if known"""
+        text = normalize_text(query)
+        matched = []
+        for entry in self.entries:
+            if entry[3] in text:
+                self.hits[entry[0]] += 1
+                matched.append(entry)
+        self.queries += 1
+
+        action = (risk_assessment or {}).get("action")
+        if action is None or action == "block":
+            return matched
+        legitimate = any(kind == "legitimate_topics" for _, _, kind, _ in matched)
+        discussed = {category for _, category, kind, _ in matched if kind == "discussion_patterns"}
+        for key, category, kind, _ in matched:
+            if kind == "blocked_patterns" and (legitimate or category in discussed):
+                self.overridden[key] += 1
+        return matched
+
+    # --- Stage timing ---
+    def _wrap(self, stage, method):
+        def timed(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                record = self.stages[stage]
+                record[0] += 1
+                record[1] += time.perf_counter_ns() - start
+        return timed
+
+    def attach(self, safety_filter):
+        """
+        Enable profiling mode on a live filter instance: stage methods on the
+        filter and its sub-filters are timed, and every filter_query result is
+        fed to observe(). Call detach() to restore the original methods.
+        """
+        wrap_stage_methods(safety_filter, self._wrap, self._patched)
+        timed_filter_query = safety_filter.filter_query
+
+        def filter_query(query, *args, **kwargs):
+            result = timed_filter_query(query, *args, **kwargs)
+            self.observe(query, result[2] if isinstance(result, tuple) and len(result) > 2 else None)
+            return result
+
+        set_method(safety_filter, "filter_query", filter_query, self._patched)
+        return safety_filter
+
+    def detach(self):
+        restore_methods(self._patched)
+
+    # --- Reporting ---
+    def report(self, top=20):
+        """Summary of hot, dead and always-overridden rules and the stage timings"""
+        hot = sorted(self.hits.items(), key=lambda item: item[1], reverse=True)[:top]
+        never_fired = defaultdict(list)
+        for key, category, kind, _ in self.entries:
+            if not self.hits.get(key):
+                never_fired[kind].append(key)
+        always_overridden = sorted(
+            key for key, count in self.overridden.items() if count == self.hits.get(key)
+        )
+        return {
+            "queries": self.queries,
+            "rules": len(self.entries),
+            "hot_rules": [{"rule": key, "hits": count} for key, count in hot],
+            "never_fired": {kind: sorted(keys) for kind, keys in never_fired.items()},
+            "always_overridden": [
+                {"rule": key, "hits": self.hits[key]} for key in always_overridden
+            ],
+            "stages": {
+                stage: {"calls": calls, "total_ms": round(total / 1e6, 3),
+                        "mean_us": round(total / max(calls, 1) / 1000, 2)}
+                for stage, (calls, total) in sorted(self.stages.items())
+            },
+        }
+
+    def print_report(self, top=20):
+        report = self.report(top)
+        print("=" * 60)
+        print("RULE PROFILE")
+        print("=" * 60)
+        print(f"Queries: {report['queries']} | Rules: {report['rules']}")
+        if report["stages"]:
+            print("\nSTAGES")
+            print("-" * 30)
+            for stage, timing in report["stages"].items():
+                print(f"{stage:<35} {timing['calls']:>7} calls  {timing['mean_us']:>10.2f} us/call")
+        print("\nHOT RULES")
+        print("-" * 30)
+        for item in report["hot_rules"]:
+            print(f"{item['hits']:>7}  {item['rule']}")
+        print("\nNEVER FIRED")
+        print("-" * 30)
+        for kind, keys in report["never_fired"].items():
+            print(f"{kind}: {len(keys)}")
+            for key in keys:
+                print(f"  {key}")
+        print("\nALWAYS OVERRIDDEN BY A DISCUSSION PATTERN")
+        print("-" * 30)
+        for item in report["always_overridden"]:
+            print(f"{item['hits']:>7}  {item['rule']}")
+        return report
+
+    def save_report(self, path=REPORT_FILE, top=20):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.report(top), f, indent=2)
+
+
+def iter_corpus_queries(corpus):
+    """Queries from a test case CSV, or from session_data of an analytics JSON file (live traffic)"""
+    if corpus.endswith(".json"):
+        with open(corpus, "r") as f:
+            data = json.load(f)
+        for event in data.get("session_data", []):
+            yield event["query"]
+    else:
+        for row in TestCaseStore(corpus).iter_cases():
+            yield row["query"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Profile rule hits and stage timings over a corpus")
+    parser.add_argument("--corpus", default=DEFAULT_TEST_CASES_FILE,
+                        help="Test case CSV, or an analytics JSON file to replay its session_data")
+    parser.add_argument("--rules", default=RULES_FILE, help="Rule configuration to profile")
+    parser.add_argument("--rules-only", action="store_true",
+                        help="Only profile rule matching, without running SafetyFilter")
+    parser.add_argument("--top", type=int, default=20, help="Number of hot rules to list")
+    parser.add_argument("--output", default=REPORT_FILE, help="Where to save the JSON report")
+    args = parser.parse_args()
+
+    profiler = RuleProfiler(load_rules(args.rules))
+    queries = iter_corpus_queries(args.corpus)
+    if args.rules_only:
+        for query in queries:
+            profiler.observe(query)
+    else:
+        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from RB_V2 import SafetyFilter
+        safety_filter = profiler.attach(SafetyFilter())
+        for query in queries:
+            safety_filter.filter_query(query)
+        profiler.detach()
+
+    profiler.print_report(args.top)
+    profiler.save_report(args.output, args.top)
+    print(f"\nProfile saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Rule Set Helpers
+Loads filter_rules.yaml and flattens it into addressable rule entries
+"""
+
+import hashlib
+import json
+
+import yaml
+
+RULES_FILE = "filter_rules.yaml"
+PATTERN_KINDS = ("blocked_patterns", "discussion_patterns")
+PHRASE_SECTIONS = ("harmful_intents", "legitimate_topics")
+THRESHOLD_KEYS = ("context_threshold", "intent_threshold", "risk_scoring")
+# Sections that never influence a filter verdict
+NON_VERDICT_SECTIONS = ("logging",)
+
+
+def load_rules(path=RULES_FILE):
+    """Load the rule configuration from YAML"""
+    with open(path, "r") as file:
+        return yaml.safe_load(file) or {}
+
+
+def normalize_text(text):
+    """Lower-case and collapse whitespace, the form patterns are matched in"""
+    return " ".join(str(text).lower().split())
+
+
+def rule_key(kind, phrase, category=None):
+    """Stable string identifier for one rule entry"""
+    if category is None:
+        return f"{kind}/{phrase}"
+    return f"{category}/{kind}/{phrase}"
+
+
+def iter_rule_entries(rules):
+    """
+    Yield (key, category, kind, phrase) for every pattern and phrase in the rule set.
+    ``category`` is None for the top-level phrase sections.
+    """
+    for category, patterns in (rules.get("safety_categories") or {}).items():
+        for kind in PATTERN_KINDS:
+            for phrase in (patterns or {}).get(kind) or []:
+                yield rule_key(kind, phrase, category), category, kind, phrase
+    for section in PHRASE_SECTIONS:
+        for phrase in rules.get(section) or []:
+            yield rule_key(section, phrase), None, section, phrase
+
+
+def threshold_values(rules):
+    """Flatten the scalar thresholds into {name: value}"""
+    values = {}
+    for key in THRESHOLD_KEYS:
+        value = rules.get(key)
+        if isinstance(value, dict):
+            for level, cutoff in value.items():
+                values[f"{key}.{level}"] = cutoff
+        elif value is not None:
+            values[key] = value
+    return values
+
+
+def digest(obj):
+    """Deterministic hash of any JSON-serializable value"""
+    payload = json.dumps(obj, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(payload).hexdigest()
+
+
+def match_groups(rules, text):
+    """
+    Reference matcher: the (category, kind) groups with at least one phrase
+    contained in the normalized text. Used to check compiled matchers against.
+    """
+    text = normalize_text(text)
+    groups = set()
+    for key, category, kind, phrase in iter_rule_entries(rules):
+        phrase = normalize_text(phrase)
+        if phrase and phrase in text:
+            groups.add((category, kind))
+    return groups
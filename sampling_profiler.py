@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Sampling Profiler
+Low-overhead stack sampling of SafetyFilter calls, attributed to pipeline
+stage and query category and exported as collapsed stacks for flame graphs.
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+from rule_profiler import restore_methods, set_method, wrap_stage_methods
+
+PROFILE_FILE = "charts/latest_profile.folded"
+SUMMARY_FILE = "charts/latest_profile_summary.json"
+DEFAULT_INTERVAL = 0.005  # seconds between samples
+_THIS_FILE = os.path.abspath(__file__)
+
+
+class _CallState:
+    """Per-thread state of one in-flight filter_query call"""
+
+    __slots__ = ("root", "stages", "pending")
+
+    def __init__(self, root):
+        self.root = root
+        self.stages = []
+        self.pending = []  # (stage, frames) sampled before the category is known
+
+
+class SamplingProfiler:
+    """
+    A background thread wakes every ``interval`` seconds, reads the stacks of
+    threads that are inside an attached filter's filter_query, and counts them.
+
+    Each sample is tagged with the innermost active stage method. It is held
+    until filter_query returns, then tagged with the verdict's category, so
+    collapsed stacks read ``stage;category;frame;...;frame count``.
+    """
+
+    def __init__(self, interval=DEFAULT_INTERVAL, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.stage_samples = Counter()
+        self.category_samples = Counter()
+        self.leaf_samples = Counter()
+        self.queries = 0
+        self.sampler_ns = 0
+        self.started = None
+        self.elapsed = 0.0
+        self._calls = {}  # thread ident -> _CallState
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._patched = []
+
+    # --- Sampling thread ---
+    def start(self):
+        if self._thread is not None:
+            return self
+        self._stop.clear()
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self.elapsed += time.perf_counter() - self.started
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            start = time.perf_counter_ns()
+            self._sample()
+            self.sampler_ns += time.perf_counter_ns() - start
+
+    def _frame_label(self, code):
+        return f"{code.co_name} ({os.path.basename(code.co_filename)})"
+
+    def _sample(self):
+        if not self._calls:
+            return
+        frames = sys._current_frames()
+        for ident, state in list(self._calls.items()):
+            frame = frames.get(ident)
+            try:
+                stage = state.stages[-1]
+            except IndexError:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                code = frame.f_code
+                if code.co_filename != _THIS_FILE:
+                    stack.append(self._frame_label(code))
+                if frame is state.root:
+                    break
+                frame = frame.f_back
+            stack.reverse()
+            state.pending.append((stage, tuple(stack)))
+
+    # --- Filter instrumentation ---
+    def _wrap_stage(self, stage, method):
+        calls = self._calls
+
+        def staged(*args, **kwargs):
+            state = calls.get(threading.get_ident())
+            if state is None:
+                return method(*args, **kwargs)
+            state.stages.append(stage)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                state.stages.pop()
+        return staged
+
+    def attach(self, safety_filter):
+        """
+        Enable profiling on a live filter instance. Stage methods on the filter
+        and its sub-filters are wrapped to track the current stage; the outer
+        filter_query opens a sampled call and attributes it on return.
+        """
+        wrap_stage_methods(safety_filter, self._wrap_stage, self._patched)
+        staged_filter_query = safety_filter.filter_query
+
+        def filter_query(query, *args, **kwargs):
+            ident = threading.get_ident()
+            if ident in self._calls:
+                return staged_filter_query(query, *args, **kwargs)
+            state = self._calls[ident] = _CallState(sys._getframe())
+            category = "error"
+            try:
+                result = staged_filter_query(query, *args, **kwargs)
+                if isinstance(result, tuple) and len(result) > 2 and isinstance(result[2], dict):
+                    category = result[2].get("category", "unknown")
+                else:
+                    category = "unknown"
+                return result
+            finally:
+                del self._calls[ident]
+                self._record(state.pending, category)
+
+        set_method(safety_filter, "filter_query", filter_query, self._patched)
+        return safety_filter
+
+    def detach(self):
+        restore_methods(self._patched)
+
+    def _record(self, pending, category):
+        with self._lock:
+            self.queries += 1
+            for stage, stack in pending:
+                self.stacks[(stage, category) + stack] += 1
+                self.stage_samples[stage] += 1
+                self.category_samples[category] += 1
+                if stack:
+                    self.leaf_samples[stack[-1]] += 1
+
+    # --- Export ---
+    def collapsed(self):
+        """Lines in the collapsed-stack format read by flamegraph.pl and speedscope"""
+        return [
+            ";".join(part.replace(";", ",") for part in stack) + f" {count}"
+            for stack, count in sorted(self.stacks.items())
+        ]
+
+    def summary(self, top=15):
+        total = sum(self.stage_samples.values())
+
+        def shares(counter):
+            return {
+                key: {"samples": count, "pct": round(count / total * 100, 1) if total else 0.0}
+                for key, count in counter.most_common()
+            }
+
+        return {
+            "generated": datetime.now().isoformat(),
+            "queries": self.queries,
+            "samples": total,
+            "interval_ms": self.interval * 1000,
+            "duration_s": round(self.elapsed, 3),
+            "sampler_overhead_pct": round(self.sampler_ns / 1e9 / self.elapsed * 100, 2) if self.elapsed else 0.0,
+            "stages": shares(self.stage_samples),
+            "categories": shares(self.category_samples),
+            "top_frames": [{"frame": frame, "samples": count} for frame, count in self.leaf_samples.most_common(top)],
+            "profile_file": PROFILE_FILE,
+        }
+
+    def save(self, profile_path=PROFILE_FILE, summary_path=SUMMARY_FILE):
+        for path in (profile_path, summary_path):
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(profile_path, "w") as f:
+            f.write("\n".join(self.collapsed()) + "\n")
+        summary = self.summary()
+        summary["profile_file"] = profile_path
+        with open(summary_path, "w") as f:
+            json.dump(summary, f, indent=2)
+        return summary
+
+
+def print_summary(summary):
+    print("=" * 60)
+    print("SAMPLING PROFILE")
+    print("=" * 60)
+    print(f"Queries: {summary['queries']} | Samples: {summary['samples']} every {summary['interval_ms']:g} ms "
+          f"| Sampler overhead: {summary['sampler_overhead_pct']}%")
+    for title, key in (("STAGES", "stages"), ("CATEGORIES", "categories")):
+        print(f"\n{title}")
+        print("-" * 30)
+        for name, share in summary[key].items():
+            print(f"{share['pct']:>6.1f}%  {share['samples']:>6}  {name}")
+    print("\nTOP FRAMES (self)")
+    print("-" * 30)
+    for item in summary["top_frames"]:
+        print(f"{item['samples']:>6}  {item['frame']}")
+    print(f"\nCollapsed stacks saved to {summary['profile_file']}")
+
+
+def main():
+    from manage_test_cases import DEFAULT_TEST_CASES_FILE, TestCaseStore
+
+    parser = argparse.ArgumentParser(description="Sample-profile SafetyFilter over the test corpus")
+    parser.add_argument("--file", default=DEFAULT_TEST_CASES_FILE, help="Test case CSV to replay")
+    parser.add_argument("--repeat", type=int, default=5, help="Passes over the corpus (more passes, more samples)")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL * 1000, help="Sampling interval in ms")
+    parser.add_argument("--output", default=PROFILE_FILE, help="Collapsed-stack output file")
+    args = parser.parse_args()
+
+    from filter_cli import load_safety_filter
+    queries = [case["query"] for case in TestCaseStore(args.file).iter_cases()]
+    profiler = SamplingProfiler(interval=args.interval / 1000)
+    safety_filter = profiler.attach(load_safety_filter())
+    profiler.start()
+    for _ in range(args.repeat):
+        for query in queries:
+            safety_filter.filter_query(query)
+    profiler.stop()
+    profiler.detach()
+    print_summary(profiler.save(profile_path=args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Session Events
+Compact struct-of-arrays storage for analytics ``session_data`` events with
+zero-copy NumPy/pandas views and round-trip to the existing JSON records.
+"""
+
+import json
+from datetime import datetime, timedelta
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_FIELDS = ("timestamp", "query", "blocked", "category", "risk_level", "response")
+
+
+class SessionEvents:
+    """
+    Parallel arrays, one slot per event:
+
+    - ``timestamp``: int64 microseconds since 1970-01-01 (naive wall-clock,
+      matching the ISO strings SafetyAnalytics writes)
+    - ``category`` / ``risk_level``: int16 codes into interned vocabularies
+    - ``blocked``: one bit per event
+    - ``query``: one UTF-8 buffer plus int64 end offsets
+
+    ``response`` is almost always null, so only non-null values are kept, by
+    index, together with any extra per-event fields (e.g. ``false_negative``).
+    Arrays grow by doubling. Views and frames returned earlier are snapshots:
+    they cover the events present at the time and do not see later appends.
+    """
+
+    def __init__(self, capacity=1024):
+        import numpy as np
+        self._np = np
+        self._size = 0
+        self._timestamps = np.empty(capacity, dtype=np.int64)
+        self._category_codes = np.empty(capacity, dtype=np.int16)
+        self._risk_codes = np.empty(capacity, dtype=np.int16)
+        self._blocked = np.zeros((capacity + 7) // 8, dtype=np.uint8)
+        self._query_ends = np.empty(capacity, dtype=np.int64)
+        self._query_buffer = bytearray()
+        self._responses = {}
+        self._extras = {}
+        self.categories = []
+        self.risk_levels = []
+        self._category_index = {}
+        self._risk_index = {}
+
+    @classmethod
+    def from_records(cls, records):
+        """Build from a list of session_data dicts"""
+        events = cls(capacity=max(len(records), 16))
+        for record in records:
+            events.append(
+                record["timestamp"], record.get("query", ""), record.get("blocked", False),
+                record.get("category", "unknown"), record.get("risk_level", "unknown"), record.get("response"),
+                **{key: value for key, value in record.items() if key not in _FIELDS}
+            )
+        return events
+
+    @classmethod
+    def load(cls, path):
+        """Load the session_data of an analytics JSON file"""
+        with open(path, 'r') as f:
+            return cls.from_records(json.load(f).get("session_data", []))
+
+    def _intern(self, value, vocabulary, index):
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(vocabulary)
+            vocabulary.append(value)
+        return code
+
+    def _grow(self):
+        np = self._np
+        capacity = len(self._timestamps) * 2
+        for name in ("_timestamps", "_category_codes", "_risk_codes", "_query_ends"):
+            old = getattr(self, name)
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+        blocked = np.zeros((capacity + 7) // 8, dtype=np.uint8)
+        blocked[:len(self._blocked)] = self._blocked
+        self._blocked = blocked
+
+    def append(self, timestamp, query, blocked, category, risk_level, response=None, **extra):
+        """Add one event; ``timestamp`` is an ISO string or a datetime"""
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp)
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone(tz=None).replace(tzinfo=None)
+        if self._size == len(self._timestamps):
+            self._grow()
+        i = self._size
+        self._timestamps[i] = (timestamp - _EPOCH) // _MICROSECOND
+        self._category_codes[i] = self._intern(category, self.categories, self._category_index)
+        self._risk_codes[i] = self._intern(risk_level, self.risk_levels, self._risk_index)
+        if blocked:
+            self._blocked[i >> 3] |= 1 << (i & 7)
+        self._query_buffer += query.encode("utf-8")
+        self._query_ends[i] = len(self._query_buffer)
+        if response is not None:
+            self._responses[i] = response
+        if extra:
+            self._extras[i] = extra
+        self._size += 1
+
+    def __len__(self):
+        return self._size
+
+    def query(self, i):
+        start = int(self._query_ends[i - 1]) if i else 0
+        return self._query_buffer[start:int(self._query_ends[i])].decode("utf-8")
+
+    def record(self, i):
+        """Event ``i`` as a session_data dict"""
+        if not 0 <= i < self._size:
+            raise IndexError(i)
+        record = {
+            "timestamp": (_EPOCH + int(self._timestamps[i]) * _MICROSECOND).isoformat(),
+            "query": self.query(i),
+            "blocked": bool(self._blocked[i >> 3] >> (i & 7) & 1),
+            "category": self.categories[self._category_codes[i]],
+            "risk_level": self.risk_levels[self._risk_codes[i]],
+            "response": self._responses.get(i),
+        }
+        record.update(self._extras.get(i, ()))
+        return record
+
+    def __iter__(self):
+        return (self.record(i) for i in range(self._size))
+
+    def to_records(self):
+        """The events as session_data dicts, in the existing JSON format"""
+        return list(self)
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_records(), **kwargs)
+
+    # --- Array views ---
+    @property
+    def timestamps(self):
+        """datetime64[us] view of the timestamp column (no copy)"""
+        return self._timestamps[:self._size].view("datetime64[us]")
+
+    @property
+    def category_codes(self):
+        return self._category_codes[:self._size]
+
+    @property
+    def risk_level_codes(self):
+        return self._risk_codes[:self._size]
+
+    @property
+    def blocked(self):
+        """Unpacked boolean column (the only column materialized on access)"""
+        np = self._np
+        return np.unpackbits(self._blocked, count=self._size, bitorder="little").view(bool)
+
+    def to_numpy(self):
+        return {
+            "timestamp": self.timestamps,
+            "blocked": self.blocked,
+            "category": self.category_codes,
+            "risk_level": self.risk_level_codes,
+        }
+
+    def to_dataframe(self, queries=True):
+        """
+        pandas DataFrame with the session_data columns. Timestamps and the
+        category codes are wrapped without copying; ``timestamp`` is already a
+        datetime column and ``category``/``risk_level`` are categoricals.
+        """
+        import pandas as pd
+        columns = {"timestamp": self.timestamps}
+        if queries:
+            columns["query"] = [self.query(i) for i in range(self._size)]
+        columns["blocked"] = self.blocked
+        columns["category"] = pd.Categorical.from_codes(self.category_codes, self.categories)
+        columns["risk_level"] = pd.Categorical.from_codes(self.risk_level_codes, self.risk_levels)
+        return pd.DataFrame(columns, copy=False)
+
+    def nbytes(self):
+        """Approximate bytes held by the event arrays"""
+        n = self._size
+        return (n * (8 + 2 + 2 + 8) + (n + 7) // 8 + len(self._query_buffer)
+                + sum(len(s) for s in self.categories + self.risk_levels))
@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+"""
+Shared Compiled Rules
+One process publishes the compiled rule set as a flat, read-only file (in
+/dev/shm where available); every worker on the host memory-maps it and
+matches against it without building its own copy.
+"""
+
+import argparse
+import array
+import bisect
+import json
+import mmap
+import os
+import re
+import sys
+import tempfile
+import time
+
+from rule_matcher import CompiledRuleSet, trie_regex
+from rule_optimizer import optimize_rules
+from rule_set import RULES_FILE, digest, iter_rule_entries, load_rules, normalize_text
+
+MAGIC = b"GRRULES1"
+DEFAULT_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+CURRENT_POINTER = "guardrails_rules.current"
+# Retired versions stay on disk this long so workers that read the old
+# pointer (or are mid-remap) can still open them
+RETIRE_GRACE_SECONDS = 60.0
+# Flat arrays stored after the header, all little-endian uint32
+ARRAYS = ("edge_start", "edge_count", "group_start", "group_count", "edge_chars", "edge_child", "group_ids")
+
+
+def _build_layout(rules):
+    """Flatten the optimized rule trie into struct-of-arrays form"""
+    optimized, _ = optimize_rules(rules)
+    groups = []
+    group_index = {}
+    trie = {}
+    phrases = set()
+    for key, category, kind, phrase in iter_rule_entries(optimized):
+        phrase = normalize_text(phrase)
+        if not phrase:
+            continue
+        phrases.add(phrase)
+        group = (category, kind)
+        if group not in group_index:
+            group_index[group] = len(groups)
+            groups.append(group)
+        node = trie
+        for char in phrase:
+            node = node.setdefault(char, {})
+        node.setdefault("", set()).add(group_index[group])
+
+    layout = {name: array.array("I") for name in ARRAYS}
+    # Breadth-first numbering keeps each node's children contiguous
+    queue = [trie]
+    head = 0
+    next_id = 1
+    while head < len(queue):
+        node = queue[head]
+        head += 1
+        children = sorted((char, child) for char, child in node.items() if char)
+        layout["edge_start"].append(len(layout["edge_chars"]))
+        layout["edge_count"].append(len(children))
+        terminal = sorted(node.get("", ()))
+        layout["group_start"].append(len(layout["group_ids"]))
+        layout["group_count"].append(len(terminal))
+        layout["group_ids"].extend(terminal)
+        for char, child in children:
+            layout["edge_chars"].append(ord(char))
+            layout["edge_child"].append(next_id)
+            next_id += 1
+            queue.append(child)
+    pattern = trie_regex(sorted(phrases)) or ""
+    return layout, groups, pattern
+
+
+def publish(rules, directory=DEFAULT_DIR):
+    """
+    Compile ``rules`` into a shared file and point workers at it.
+    Returns the path of the published file. Publishing the same rule version
+    twice is a no-op.
+    """
+    version = digest(rules)
+    path = os.path.join(directory, f"guardrails_rules-{version[:16]}.bin")
+    if not os.path.exists(path):
+        layout, groups, pattern = _build_layout(rules)
+        offsets = {}
+        position = 0
+        for name in ARRAYS:
+            offsets[name] = [position, len(layout[name])]
+            position += len(layout[name]) * 4
+        header = json.dumps({
+            "version": version,
+            "groups": groups,
+            "pattern": pattern,
+            "arrays": offsets,
+        }).encode("utf-8")
+        padding = (-(len(MAGIC) + 4 + len(header))) % 8
+        tmp_path = path + f".{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(MAGIC)
+            f.write(len(header).to_bytes(4, "little"))
+            f.write(header)
+            f.write(b"\0" * padding)
+            for name in ARRAYS:
+                values = layout[name]
+                if sys.byteorder != "little":
+                    values = array.array("I", values)
+                    values.byteswap()
+                values.tofile(f)
+        os.replace(tmp_path, path)
+
+    pointer = os.path.join(directory, CURRENT_POINTER)
+    previous = _read_pointer(pointer)
+    tmp_pointer = pointer + f".{os.getpid()}.tmp"
+    with open(tmp_pointer, "w") as f:
+        f.write(path)
+    os.replace(tmp_pointer, pointer)
+    if previous and previous != path and os.path.exists(previous):
+        # Mark when the previous version was retired; it is collected later
+        os.utime(previous)
+    _collect_retired(directory, keep=(path, previous))
+    return path
+
+
+def _collect_retired(directory, keep, grace=RETIRE_GRACE_SECONDS):
+    """
+    Remove published versions retired more than ``grace`` seconds ago.
+    Workers still mapping a removed version keep their mapping after unlink.
+    """
+    cutoff = time.time() - grace
+    for name in os.listdir(directory):
+        if not (name.startswith("guardrails_rules-") and name.endswith(".bin")):
+            continue
+        path = os.path.join(directory, name)
+        if path in keep:
+            continue
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def _read_pointer(pointer):
+    try:
+        with open(pointer, "r") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+class SharedRuleSet:
+    """
+    Read-only view of a published rule file. ``match(text)`` has the same
+    result as CompiledRuleSet.match; the trie is walked directly in the
+    mapping, so per-worker memory is the compiled scanner regex only.
+    When the published rule version changes, the next match remaps.
+    """
+
+    def __init__(self, directory=DEFAULT_DIR, check_interval=1.0):
+        self.pointer = os.path.join(directory, CURRENT_POINTER)
+        self.check_interval = check_interval
+        self.path = None
+        self._mmap = None
+        self._views = []
+        self._next_check = 0.0
+        self.remaps = 0
+        self.failed_remaps = 0
+        path = _read_pointer(self.pointer)
+        if path is None:
+            raise FileNotFoundError(f"No published rules in {directory}; run 'python shared_rules.py publish'")
+        self._map(path)
+
+    def _map(self, path):
+        with open(path, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(mapping)
+        views = {}
+        try:
+            if mapping[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} is not a published rule file")
+            header_length = int.from_bytes(mapping[len(MAGIC):len(MAGIC) + 4], "little")
+            header_end = len(MAGIC) + 4 + header_length
+            header = json.loads(mapping[len(MAGIC) + 4:header_end].decode("utf-8"))
+            data_start = header_end + (-header_end) % 8
+            for name in ARRAYS:
+                offset, count = header["arrays"][name]
+                start = data_start + offset
+                if start + count * 4 > len(mapping):
+                    raise ValueError(f"{path} is truncated")
+                views[name] = buffer[start:start + count * 4].cast("I")
+        except Exception:
+            for view in views.values():
+                view.release()
+            buffer.release()
+            mapping.close()
+            raise
+
+        self._unmap()
+        self._mmap = mapping
+        self._views = [buffer] + list(views.values())
+        for name, view in views.items():
+            setattr(self, name, view)
+        self.version = header["version"]
+        self.groups = [tuple(group) for group in header["groups"]]
+        self.scanner = re.compile(f"(?={header['pattern']})") if header["pattern"] else None
+        self.path = path
+
+    def _unmap(self):
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+    def refresh(self):
+        """
+        Remap if a new rule version has been published. Returns True on remap.
+        If the new file cannot be mapped, the current mapping stays in use and
+        the remap is retried on the next check.
+        """
+        try:
+            path = _read_pointer(self.pointer)
+            if path and path != self.path:
+                self._map(path)
+                self.remaps += 1
+                return True
+        except (OSError, ValueError):
+            self.failed_remaps += 1
+        return False
+
+    def close(self):
+        self._unmap()
+
+    def match(self, text):
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            self.refresh()
+        if self.scanner is None:
+            return set()
+        text = normalize_text(text)
+        edge_start, edge_count, edge_chars, edge_child = self.edge_start, self.edge_count, self.edge_chars, self.edge_child
+        group_start, group_count, group_ids = self.group_start, self.group_count, self.group_ids
+        matched = set()
+        for found in self.scanner.finditer(text):
+            node = 0
+            for index in range(found.start(), len(text)):
+                low = edge_start[node]
+                high = low + edge_count[node]
+                code = ord(text[index])
+                position = bisect.bisect_left(edge_chars, code, low, high)
+                if position == high or edge_chars[position] != code:
+                    break
+                node = edge_child[position]
+                first = group_start[node]
+                for group in range(first, first + group_count[node]):
+                    matched.add(group_ids[group])
+        return {self.groups[group] for group in matched}
+
+    def memory_report(self, rules, workers=1):
+        """
+        Shared mapping size compared with a private copy of the in-tree
+        CompiledRuleSet trie plus the rule dict. This is an estimate against
+        the in-tree matcher, not an RSS measurement: RB_V2's SafetyFilter keeps
+        its own rule structures and does not use this mapping.
+        """
+        matcher = deep_sizeof(CompiledRuleSet(rules).trie) + deep_sizeof(rules)
+        shared = len(self._mmap) if self._mmap is not None else 0
+        return {
+            "version": self.version[:16],
+            "workers": workers,
+            "shared_bytes": shared,
+            "compiled_matcher_bytes_per_worker": matcher,
+            "saved_vs_compiled_matcher_per_worker": matcher - shared // max(workers, 1),
+        }
+
+
+def deep_sizeof(obj, seen=None):
+    """Approximate memory held by a tree of dicts/lists/sets/strings"""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(key, seen) + deep_sizeof(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish or inspect shared compiled rules")
+    parser.add_argument("command", choices=["publish", "stats"], help="publish the rules, or report memory use")
+    parser.add_argument("--rules", default=RULES_FILE, help="Rule configuration to compile")
+    parser.add_argument("--dir", default=DEFAULT_DIR, help=f"Directory for the shared file (default: {DEFAULT_DIR})")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="Worker processes per host, for the memory report")
+    args = parser.parse_args()
+
+    rules = load_rules(args.rules)
+    if args.command == "publish":
+        path = publish(rules, args.dir)
+        print(f"Published {args.rules} to {path} ({os.path.getsize(path)} bytes)")
+    else:
+        shared = SharedRuleSet(args.dir)
+        report = shared.memory_report(rules, args.workers)
+        print(f"Rule version: {report['version']} ({shared.path})")
+        print(f"Shared mapping: {report['shared_bytes']} bytes (once per host)")
+        print(f"Private CompiledRuleSet copy (in-tree matcher): {report['compiled_matcher_bytes_per_worker']} bytes per worker")
+        print(f"Saved per worker vs. the in-tree matcher: {report['saved_vs_compiled_matcher_per_worker']} bytes "
+              f"with {report['workers']} workers (estimate, not RSS; RB_V2 does not use the mapping)")
+        shared.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Checks for the live dashboard rollups: totals and time buckets, including
+events that arrive out of order.
+"""
+
+from live_analytics import LiveRollups
+
+
+def event(time, blocked=False, category="legitimate"):
+    return {"timestamp": f"2024-01-01T{time}:00", "blocked": blocked, "category": category, "risk_level": "low"}
+
+
+def starts(rollups):
+    return [start.strftime("%H:%M") for start, queries, blocked in rollups.series()]
+
+
+def test_totals_and_buckets():
+    rollups = LiveRollups(bucket_seconds=60)
+    assert rollups.update([event("10:00"), event("10:00", blocked=True, category="violence"), event("10:02")]) == 3
+    assert rollups.total == 3
+    assert rollups.blocked == 1
+    assert rollups.categories == {"legitimate": 2, "violence": 1}
+    assert [(queries, blocked) for start, queries, blocked in rollups.series()] == [(2, 1), (1, 0)]
+    assert rollups.last_event == "2024-01-01T10:02:00"
+
+
+def test_late_events_are_sorted_and_oldest_bucket_evicted():
+    rollups = LiveRollups(bucket_seconds=60, max_buckets=2)
+    rollups.update([event("10:05"), event("10:01")])
+    assert starts(rollups) == ["10:01", "10:05"]
+    rollups.update([event("10:03")])
+    assert starts(rollups) == ["10:03", "10:05"]
+    # A late event older than every kept bucket does not displace a newer one
+    rollups.update([event("10:00")])
+    assert starts(rollups) == ["10:03", "10:05"]
+    assert rollups.total == 4
+
+
+def test_events_without_timestamp_only_count_in_totals():
+    rollups = LiveRollups()
+    rollups.update([{"blocked": True, "category": "violence"}, {"timestamp": "not a time"}])
+    assert rollups.total == 2 and rollups.blocked == 1
+    assert rollups.series() == []
+
+
+if __name__ == "__main__":
+    test_totals_and_buckets()
+    test_late_events_are_sorted_and_oldest_bucket_evicted()
+    test_events_without_timestamp_only_count_in_totals()
+    print("Live analytics tests passed")
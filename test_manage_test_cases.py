@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Checks for the append-only TestCaseStore: adding, deduplication, deletes,
+compaction and imports.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+from manage_test_cases import TestCaseStore
+
+
+def new_store():
+    directory = tempfile.mkdtemp()
+    return TestCaseStore(os.path.join(directory, "cases.csv")), directory
+
+
+def test_add_and_dedupe():
+    store, directory = new_store()
+    try:
+        assert store.add("How to make a bomb", "block", "violence", "weapons", ["smoke"]) == 1
+        assert store.add("What is the law?", "allow", "legitimate") == 2
+        # Duplicates are detected case and whitespace insensitively
+        assert store.add("  how to   MAKE a bomb ", "block", "violence") is None
+        assert len(store) == 2
+        cases = list(TestCaseStore(store.path).iter_cases())
+        assert [case['id'] for case in cases] == [1, 2]
+        assert cases[0]['tags'] == ["smoke"]
+        assert [case['query'] for case in store.select(tag="smoke")] == ["How to make a bomb"]
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_invalid_cases_are_rejected():
+    store, directory = new_store()
+    try:
+        for args in (("", "block", "violence"), ("query", "maybe", "violence"), ("query", "allow", "")):
+            try:
+                store.add(*args)
+            except ValueError:
+                continue
+            raise AssertionError(f"accepted invalid case {args}")
+        assert len(store) == 0
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_delete_and_compact_keep_ids_stable():
+    store, directory = new_store()
+    try:
+        for i in range(3):
+            store.add(f"query {i}", "allow", "legitimate")
+        assert store.delete(2)
+        assert not store.delete(2)
+        reopened = TestCaseStore(store.path)
+        assert [case['id'] for case in reopened.iter_cases()] == [1, 3]
+        # A deleted query can be added again, under a new id
+        assert reopened.add("query 1", "allow", "legitimate") == 4
+
+        assert reopened.compact() == 1
+        assert [case['id'] for case in TestCaseStore(store.path).iter_cases()] == [1, 3, 4]
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_highest_id_is_not_reused_after_compact():
+    store, directory = new_store()
+    try:
+        store.add("first", "allow", "legitimate")
+        assert store.add("second", "block", "violence") == 2
+        store.delete(2)
+        store.compact()
+        assert TestCaseStore(store.path).add("third", "allow", "legitimate") == 3
+        # And again after a second compaction with nothing deleted
+        store = TestCaseStore(store.path)
+        store.compact()
+        assert TestCaseStore(store.path).add("fourth", "allow", "legitimate") == 4
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_import_counts_added_duplicates_and_invalid():
+    store, directory = new_store()
+    try:
+        store.add("existing query", "allow", "legitimate")
+        source = os.path.join(directory, "import.jsonl")
+        with open(source, "w", encoding='utf-8') as file:
+            for record in (
+                {"query": "new query", "expected_action": "block", "expected_category": "violence", "tags": "a;b"},
+                {"query": "Existing  Query", "expected_action": "allow", "expected_category": "legitimate"},
+                {"query": "new query", "expected_action": "block", "expected_category": "violence"},
+                {"query": "no action", "expected_category": "violence"},
+            ):
+                file.write(json.dumps(record) + "\n")
+            file.write("not json\n")
+        assert store.import_file(source, tags=["imported"]) == (1, 2, 2)
+        imported = [case for case in TestCaseStore(store.path).iter_cases() if case['query'] == "new query"]
+        assert imported[0]['tags'] == ["imported", "a", "b"]
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    test_add_and_dedupe()
+    test_invalid_cases_are_rejected()
+    test_delete_and_compact_keep_ids_stable()
+    test_highest_id_is_not_reused_after_compact()
+    test_import_counts_added_duplicates_and_invalid()
+    print("Test case store tests passed")
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Checks for the differential test runner's RuleImpactCache: which cases a rule
+edit marks stale and what survives an interrupted run.
+"""
+
+import copy
+import os
+import shutil
+import tempfile
+
+from rule_impact import RuleImpactCache
+
+QUERIES = ["How to kill a process", "History of war", "What is the weather", "Make a weapon"]
+RULES = {
+    "context_threshold": 0.85,
+    "intent_threshold": 0.7,
+    "risk_scoring": {"low": 0.3, "medium": 0.6, "high": 0.8},
+    "safety_categories": {
+        "violence": {
+            "blocked_patterns": ["how to kill", "make a weapon"],
+            "discussion_patterns": ["history of war"],
+        },
+    },
+    "harmful_intents": ["I want to harm someone"],
+    "legitimate_topics": ["computer science"],
+}
+SCORES = {
+    "How to kill a process": 0.9,
+    "History of war": 0.5,
+    "What is the weather": 0.1,
+    "Make a weapon": 0.95,
+}
+
+
+def new_cache_file():
+    directory = tempfile.mkdtemp()
+    return os.path.join(directory, "cache.json"), directory
+
+
+def run(rules, cache_file, queries=QUERIES):
+    """Plan and record a complete run; returns the queries that were re-evaluated"""
+    cache = RuleImpactCache(rules, cache_file=cache_file)
+    stale, reason = cache.plan(queries)
+    for query in stale:
+        cache.record(query, SCORES[query] < 0.7, "", {"confidence": SCORES[query]})
+    cache.save()
+    return stale
+
+
+def plan(rules, cache_file):
+    return RuleImpactCache(rules, cache_file=cache_file).plan(QUERIES)[0]
+
+
+def test_first_run_then_nothing_stale():
+    cache_file, directory = new_cache_file()
+    try:
+        assert run(RULES, cache_file) == set(QUERIES)
+        assert plan(RULES, cache_file) == set()
+        cache = RuleImpactCache(RULES, cache_file=cache_file)
+        cache.plan(QUERIES)
+        assert cache.verdict("Make a weapon") == (False, "", {"confidence": 0.95})
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_removed_pattern_marks_its_cases_stale():
+    cache_file, directory = new_cache_file()
+    try:
+        run(RULES, cache_file)
+        rules = copy.deepcopy(RULES)
+        rules["safety_categories"]["violence"]["blocked_patterns"].remove("make a weapon")
+        assert plan(rules, cache_file) == {"Make a weapon"}
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_added_phrase_marks_matching_queries_stale():
+    cache_file, directory = new_cache_file()
+    try:
+        run(RULES, cache_file)
+        rules = copy.deepcopy(RULES)
+        # Matched case and whitespace insensitively
+        rules["safety_categories"]["violence"]["discussion_patterns"].append("the  WEATHER")
+        assert plan(rules, cache_file) == {"What is the weather"}
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_threshold_change_only_marks_scores_in_between():
+    cache_file, directory = new_cache_file()
+    try:
+        run(RULES, cache_file)
+        rules = copy.deepcopy(RULES)
+        rules["risk_scoring"]["medium"] = 0.4
+        assert plan(rules, cache_file) == {"History of war"}
+        rules["risk_scoring"]["medium"] = 0.65
+        assert plan(rules, cache_file) == set()
+        rules["context_threshold"] = 0.92
+        assert plan(rules, cache_file) == {"How to kill a process"}
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_semantic_sections_invalidate_everything():
+    cache_file, directory = new_cache_file()
+    try:
+        run(RULES, cache_file)
+        for section in ("harmful_intents", "legitimate_topics"):
+            rules = copy.deepcopy(RULES)
+            rules[section].append("something new")
+            assert plan(rules, cache_file) == set(QUERIES), section
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_interrupted_run_does_not_hide_stale_cases():
+    cache_file, directory = new_cache_file()
+    try:
+        run(RULES, cache_file)
+        rules = copy.deepcopy(RULES)
+        rules["safety_categories"]["violence"]["blocked_patterns"].remove("how to kill")
+        rules["safety_categories"]["violence"]["blocked_patterns"].remove("make a weapon")
+        cache = RuleImpactCache(rules, cache_file=cache_file)
+        stale, reason = cache.plan(QUERIES)
+        assert stale == {"How to kill a process", "Make a weapon"}
+        # Only one of the stale cases is re-evaluated before the run fails
+        cache.record("Make a weapon", True, "", {"confidence": 0.2})
+        cache.save()
+        assert plan(rules, cache_file) == {"How to kill a process"}
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == "__main__":
+    test_first_run_then_nothing_stale()
+    test_removed_pattern_marks_its_cases_stale()
+    test_added_phrase_marks_matching_queries_stale()
+    test_threshold_change_only_marks_scores_in_between()
+    test_semantic_sections_invalidate_everything()
+    test_interrupted_run_does_not_hide_stale_cases()
+    print("Rule impact cache tests passed")
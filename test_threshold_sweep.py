@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Checks the vectorized threshold sweep against a per-query brute force of
+its documented decision model.
+"""
+
+import random
+
+import numpy as np
+
+from threshold_sweep import sweep
+
+
+def decide(score, c, i, m):
+    """Predicted harmful under the decision model documented in sweep()"""
+    legitimate = score["semantic_category"] == "legitimate"
+    if legitimate and score["confidence"] >= c and not score["pattern_blocked"]:
+        return False
+    blocked = score["pattern_blocked"] or (not legitimate and score["confidence"] >= i)
+    flagged = not legitimate and score["confidence"] >= m
+    return blocked or flagged
+
+
+def random_scores(n, seed=0):
+    rng = random.Random(seed)
+    return [{
+        "harmful": rng.random() < 0.5,
+        "pattern_blocked": rng.random() < 0.2,
+        "semantic_category": rng.choice(["legitimate", "violence", "hate_speech"]),
+        # Include exact zeros and ones so the grid edges are exercised
+        "confidence": rng.choice([0.0, 1.0, round(rng.random(), 2)]),
+    } for _ in range(n)]
+
+
+def test_sweep_matches_brute_force():
+    scores = random_scores(300)
+    grid = np.linspace(0.0, 1.0, 6)
+    counts = sweep(scores, grid, grid, grid)
+    for ci, c in enumerate(grid):
+        for ii, i in enumerate(grid):
+            for mi, m in enumerate(grid):
+                tp = fp = 0
+                for score in scores:
+                    if decide(score, c, i, m):
+                        tp += score["harmful"]
+                        fp += not score["harmful"]
+                assert counts["tp"][ci, ii, mi] == tp, (c, i, m)
+                assert counts["fp"][ci, ii, mi] == fp, (c, i, m)
+    positives = sum(score["harmful"] for score in scores)
+    assert (counts["tp"] + counts["fn"] == positives).all()
+    assert (counts["fp"] + counts["tn"] == len(scores) - positives).all()
+
+
+def test_zero_thresholds_stay_within_class():
+    scores = [
+        {"harmful": True, "pattern_blocked": False, "semantic_category": "violence", "confidence": 0.4},
+        {"harmful": False, "pattern_blocked": False, "semantic_category": "legitimate", "confidence": 0.4},
+    ]
+    counts = sweep(scores, [0.0], [0.0], [0.0])
+    # The harmful query is not a legitimate override; the legitimate one is not harmful
+    assert counts["tp"][0, 0, 0] == 1
+    assert counts["fp"][0, 0, 0] == 0
+
+
+if __name__ == "__main__":
+    test_sweep_matches_brute_force()
+    test_zero_thresholds_stay_within_class()
+    print("Threshold sweep tests passed")
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Threshold Sweep
+Scores the labelled test corpus once, then evaluates a full grid of
+context_threshold / intent_threshold / risk_scoring.medium settings with
+NumPy and reports ROC and precision-recall curves plus the best settings.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+import numpy as np
+
+from manage_test_cases import DEFAULT_TEST_CASES_FILE, TestCaseStore
+from rule_set import RULES_FILE, THRESHOLD_KEYS, digest, load_rules
+
+SCORES_CACHE = "threshold_scores_cache.json"
+SWEEP_FILE = "charts/threshold_sweep.json"
+HARMFUL_ACTIONS = ("block", "flag")
+
+
+def collect_scores(rules, cases, cache_file=SCORES_CACHE, refresh=False):
+    """
+    Raw per-query scores from RB_V2's ContextAwareFilter, cached per rule
+    set and corpus. Thresholds are excluded from the cache key: they are
+    applied by the sweep, not by the scoring.
+    """
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    import RB_V2
+    from rule_impact import engine_fingerprint
+
+    scoring_rules = {key: value for key, value in rules.items() if key not in THRESHOLD_KEYS}
+    key = digest({
+        "rules": scoring_rules,
+        "engine": engine_fingerprint(RB_V2),
+        "queries": [case["query"] for case in cases],
+    })
+    if not refresh and os.path.exists(cache_file):
+        with open(cache_file, "r") as f:
+            cached = json.load(f)
+        if cached.get("key") == key:
+            return cached["scores"]
+
+    context_filter = RB_V2.ContextAwareFilter(rules)
+    scores = []
+    for case in cases:
+        blocked, _reason, _pattern_category = context_filter.check_patterns(case["query"])
+        category, confidence, _risk_level = context_filter.analyze_context(case["query"])
+        scores.append({
+            "query": case["query"],
+            "harmful": case["expected_action"] in HARMFUL_ACTIONS,
+            "pattern_blocked": bool(blocked),
+            "semantic_category": category,
+            "confidence": float(confidence),
+        })
+    with open(cache_file, "w") as f:
+        json.dump({"key": key, "scores": scores}, f)
+    return scores
+
+
+def sweep(scores, context_grid, intent_grid, medium_grid):
+    """
+    Confusion counts for every (context, intent, medium) threshold triple.
+
+    Decision model applied per query:
+    - legitimate override: semantic category "legitimate" with confidence >= context_threshold
+      and no blocked pattern -> allow
+    - block: a blocked pattern matched, or harmful confidence >= intent_threshold
+    - flag: harmful confidence >= risk_scoring.medium
+    A query counts as predicted harmful when it is blocked or flagged.
+
+    risk_scoring.low and risk_scoring.high are not swept: they only grade the
+    risk level reported with a verdict. A confidence above high is already
+    above medium and flagged, and one below medium is allowed whether it is
+    graded low or medium, so neither cutoff can change blocked/flagged vs allowed.
+
+    Returns a dict of (C, I, M) int arrays: tp, fp, fn, tn.
+    """
+    y = np.array([score["harmful"] for score in scores], dtype=bool)
+    pattern = np.array([score["pattern_blocked"] for score in scores], dtype=bool)
+    legitimate = np.array([score["semantic_category"] == "legitimate" for score in scores], dtype=bool)
+    confidence = np.array([score["confidence"] for score in scores], dtype=float)
+
+    context_grid = np.asarray(context_grid, dtype=float)
+    intent_grid = np.asarray(intent_grid, dtype=float)
+    medium_grid = np.asarray(medium_grid, dtype=float)
+
+    # Confidence only counts for its own class, so a threshold of 0 must not
+    # pull queries of the other class over it
+    override = (legitimate & ~pattern)[None, :] & (confidence[None, :] >= context_grid[:, None])   # (C, N)
+    blocked = pattern[None, :] | (~legitimate[None, :] & (confidence[None, :] >= intent_grid[:, None]))  # (I, N)
+    flagged = ~legitimate[None, :] & (confidence[None, :] >= medium_grid[:, None])               # (M, N)
+    harmful = blocked[:, None, :] | flagged[None, :, :]                                           # (I, M, N)
+
+    shape = (len(context_grid), len(intent_grid), len(medium_grid))
+    tp = np.empty(shape, dtype=np.int64)
+    fp = np.empty(shape, dtype=np.int64)
+    positives = int(y.sum())
+    negatives = len(y) - positives
+    y_int = y.astype(np.int64)
+    not_y_int = (~y).astype(np.int64)
+    # One context threshold at a time keeps memory at O(I * M * N)
+    for index in range(len(context_grid)):
+        predicted = (harmful & ~override[index][None, None, :]).astype(np.int64)
+        tp[index] = predicted @ y_int
+        fp[index] = predicted @ not_y_int
+    return {"tp": tp, "fp": fp, "fn": positives - tp, "tn": negatives - fp}
+
+
+def check_against_engine(scores, cases, current):
+    """
+    The decision model in sweep() is this tool's approximation of RB_V2.
+    Run the real SafetyFilter (which reads its own rule configuration) over
+    the corpus and return ((engine tp, fp), (model tp, fp)) at ``current``.
+    """
+    from filter_cli import load_safety_filter
+
+    safety_filter = load_safety_filter()
+    engine_tp = engine_fp = 0
+    for case in cases:
+        _is_safe, _message, risk_assessment = safety_filter.filter_query(case["query"])
+        if risk_assessment.get("action") in HARMFUL_ACTIONS:
+            if case["expected_action"] in HARMFUL_ACTIONS:
+                engine_tp += 1
+            else:
+                engine_fp += 1
+    model = sweep(scores, [current[0]], [current[1]], [current[2]])
+    return (engine_tp, engine_fp), (int(model["tp"][0, 0, 0]), int(model["fp"][0, 0, 0]))
+
+
+def summarize(counts, context_grid, intent_grid, medium_grid, current=None, fpr_budget=0.05):
+    """ROC/PR points, their frontiers and the best operating points"""
+    tp, fp, fn, tn = counts["tp"], counts["fp"], counts["fn"], counts["tn"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tpr = np.where(tp + fn > 0, tp / (tp + fn), 0.0)
+        fpr = np.where(fp + tn > 0, fp / (fp + tn), 0.0)
+        precision = np.where(tp + fp > 0, tp / (tp + fp), 1.0)
+        f1 = np.where(precision + tpr > 0, 2 * precision * tpr / (precision + tpr), 0.0)
+
+    def point(index):
+        c, i, m = (int(value) for value in index)
+        return {
+            "context_threshold": float(context_grid[c]),
+            "intent_threshold": float(intent_grid[i]),
+            "risk_medium": float(medium_grid[m]),
+            "tpr": float(tpr[c, i, m]),
+            "fpr": float(fpr[c, i, m]),
+            "precision": float(precision[c, i, m]),
+            "f1": float(f1[c, i, m]),
+        }
+
+    best = {
+        "max_f1": point(np.unravel_index(np.argmax(f1), f1.shape)),
+        "max_youden_j": point(np.unravel_index(np.argmax(tpr - fpr), tpr.shape)),
+    }
+    within_budget = np.where(fpr <= fpr_budget, tpr, -1.0)
+    if within_budget.max() >= 0:
+        best[f"max_tpr_at_fpr_{fpr_budget:g}"] = point(np.unravel_index(np.argmax(within_budget), tpr.shape))
+    if current is not None:
+        index = tuple(int(np.abs(grid - value).argmin()) for grid, value in zip(
+            (context_grid, intent_grid, medium_grid), current))
+        best["current_config"] = point(index)
+
+    return {
+        "settings": int(tpr.size),
+        "roc": _frontier(fpr.ravel(), tpr.ravel()),
+        "pr": _frontier(tpr.ravel(), precision.ravel(), increasing=False),
+        "best": best,
+    }
+
+
+def _frontier(x, y, increasing=True):
+    """
+    Upper envelope of the (x, y) cloud: best y for each distinct x, made
+    monotone (non-decreasing for ROC, non-increasing for interpolated PR)
+    """
+    order = np.lexsort((-y, x))
+    x, y = x[order], y[order]
+    unique_x, first = np.unique(x, return_index=True)
+    best_y = y[first]
+    if increasing:
+        best_y = np.maximum.accumulate(best_y)
+    else:
+        best_y = np.maximum.accumulate(best_y[::-1])[::-1]
+    return {"x": unique_x.round(6).tolist(), "y": best_y.round(6).tolist()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep filter thresholds over the labelled test corpus")
+    parser.add_argument("--rules", default=RULES_FILE, help="Rule configuration to score with")
+    parser.add_argument("--corpus", default=DEFAULT_TEST_CASES_FILE, help="Labelled test case CSV")
+    parser.add_argument("--steps", type=int, default=21, help="Grid points per threshold between 0 and 1")
+    parser.add_argument("--fpr-budget", type=float, default=0.05, help="False positive rate budget")
+    parser.add_argument("--refresh", action="store_true", help="Recompute the cached raw scores")
+    parser.add_argument("--engine-check", action="store_true",
+                        help="Compare the sweep model with real SafetyFilter verdicts (runs the whole corpus)")
+    parser.add_argument("--output", default=SWEEP_FILE, help="Where to save the sweep summary")
+    args = parser.parse_args()
+
+    rules = load_rules(args.rules)
+    cases = list(TestCaseStore(args.corpus).iter_cases())
+    scores = collect_scores(rules, cases, refresh=args.refresh)
+    grid = np.linspace(0.0, 1.0, args.steps)
+    counts = sweep(scores, grid, grid, grid)
+    current = (
+        rules.get("context_threshold", 0.85),
+        rules.get("intent_threshold", 0.70),
+        (rules.get("risk_scoring") or {}).get("medium", 0.6),
+    )
+    summary = summarize(counts, grid, grid, grid, current=current, fpr_budget=args.fpr_budget)
+    summary["queries"] = len(scores)
+
+    if args.engine_check and os.path.abspath(args.rules) != os.path.abspath(RULES_FILE):
+        print(f"Skipping the engine check: SafetyFilter reads {RULES_FILE}, not {args.rules}")
+    elif args.engine_check:
+        engine, model = check_against_engine(scores, cases, current)
+        summary["engine_check"] = {"engine": {"tp": engine[0], "fp": engine[1]},
+                                   "model": {"tp": model[0], "fp": model[1]}, "match": engine == model}
+        if engine != model:
+            print(f"WARNING: at the current thresholds the sweep model gives TP={model[0]} FP={model[1]}, "
+                  f"but SafetyFilter gives TP={engine[0]} FP={engine[1]}. "
+                  "The best points below may not carry over to the engine.")
+        else:
+            print(f"Sweep model matches SafetyFilter at the current thresholds (TP={engine[0]} FP={engine[1]})")
+
+    print(f"Evaluated {summary['settings']} threshold settings over {len(scores)} queries")
+    for name, best in summary["best"].items():
+        print(f"{name:<22} context={best['context_threshold']:.2f} intent={best['intent_threshold']:.2f} "
+              f"medium={best['risk_medium']:.2f} | TPR {best['tpr']:.3f} FPR {best['fpr']:.3f} "
+              f"precision {best['precision']:.3f} F1 {best['f1']:.3f}")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(summary, f, indent=2)
+    print(f"Sweep saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
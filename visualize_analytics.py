@@ -4,17 +4,26 @@ Analytics Visualization Module
 Generates charts and graphs for test analytics
 """
 
+import argparse
 import json
-import matplotlib.pyplot as plt
-import seaborn as sns
-import pandas as pd
-import numpy as np
 from datetime import datetime
 import os
 
-# Set style for better-looking charts
-plt.style.use('seaborn-v0_8')
-sns.set_palette("husl")
+from session_events import SessionEvents
+
+_plotting = None
+
+def plotting_modules():
+    """Import matplotlib and seaborn on first use and apply the chart style once"""
+    global _plotting
+    if _plotting is None:
+        import matplotlib.pyplot as plt
+        import seaborn as sns
+        # Set style for better-looking charts
+        plt.style.use('seaborn-v0_8')
+        sns.set_palette("husl")
+        _plotting = (plt, sns)
+    return _plotting
 
 class AnalyticsVisualizer:
     def __init__(self, analytics_file="test_analytics.json"):
@@ -26,13 +35,25 @@ class AnalyticsVisualizer:
         """Load analytics data from JSON file"""
         try:
             with open(self.analytics_file, 'r') as f:
-                return json.load(f)
+                data = json.load(f)
         except FileNotFoundError:
             print(f"Analytics file {self.analytics_file} not found!")
             return None
+        return data
+
+    def session_events(self, data):
+        """
+        Compact session_data for the chart methods, converted on first use so
+        text-only paths never import NumPy
+        """
+        if not isinstance(data['session_data'], SessionEvents):
+            data['session_data'] = SessionEvents.from_records(data['session_data'])
+        return data['session_data']
     
     def create_current_test_charts(self, test_results):
         """Create charts for the current test run"""
+        import numpy as np
+        plt, sns = plotting_modules()
         print("Generating current test run charts...")
         
         # Extract metrics from test results
@@ -119,6 +140,7 @@ class AnalyticsVisualizer:
     
     def create_overall_analytics_charts(self):
         """Create charts for overall analytics from JSON file"""
+        plt, sns = plotting_modules()
         print("Generating overall analytics charts...")
         
         data = self.load_analytics()
@@ -131,8 +153,7 @@ class AnalyticsVisualizer:
         
         # 1. Query Volume Over Time
         if 'session_data' in data and data['session_data']:
-            df = pd.DataFrame(data['session_data'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
+            df = self.session_events(data).to_dataframe(queries=False)
             df['date'] = df['timestamp'].dt.date
             
             daily_counts = df.groupby('date').size()
@@ -171,8 +192,7 @@ class AnalyticsVisualizer:
         
         # 4. Performance Metrics Over Time
         if 'session_data' in data and data['session_data']:
-            df = pd.DataFrame(data['session_data'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
+            df = self.session_events(data).to_dataframe(queries=False)
             df['date'] = df['timestamp'].dt.date
             
             # Calculate daily performance metrics
@@ -201,11 +221,11 @@ class AnalyticsVisualizer:
     
     def create_detailed_charts(self, data):
         """Create additional detailed charts"""
+        plt, sns = plotting_modules()
         
         # 1. Hourly Activity Pattern
         if 'session_data' in data and data['session_data']:
-            df = pd.DataFrame(data['session_data'])
-            df['timestamp'] = pd.to_datetime(df['timestamp'])
+            df = self.session_events(data).to_dataframe(queries=False)
             df['hour'] = df['timestamp'].dt.hour
             
             hourly_counts = df.groupby('hour').size()
@@ -222,8 +242,8 @@ class AnalyticsVisualizer:
         
         # 2. Block Rate by Category
         if 'categories_blocked' in data and 'session_data' in data:
-            df = pd.DataFrame(data['session_data'])
-            category_block_rates = df.groupby('category').agg({
+            df = self.session_events(data).to_dataframe(queries=False)
+            category_block_rates = df.groupby('category', observed=True).agg({
                 'blocked': ['sum', 'count']
             })
             category_block_rates.columns = ['blocked_count', 'total_count']
@@ -321,7 +341,14 @@ class AnalyticsVisualizer:
 
 def main():
     """Main function for standalone usage"""
+    parser = argparse.ArgumentParser(description="Generate analytics charts and reports")
+    parser.add_argument("--text-only", action="store_true",
+                        help="Only print the text report (skips pandas/matplotlib entirely)")
+    args = parser.parse_args()
     visualizer = AnalyticsVisualizer()
+    if args.text_only:
+        visualizer.generate_text_report()
+        return
     
     # Example test results (replace with actual results)
     test_results = {